@@ -20,8 +20,17 @@ export const upload = async (req, res) => {
 
 export const getFiles = async (req, res) => {
   const id = req.data.id;
-  const response = await fileServices.getFiles(id);
-  return res.status(200).json(response);
+  // ?since=<cursor>&limit=<n>: đồng bộ tăng dần (catalog file phía client)
+  const { since, limit } = req.query;
+  try {
+    const response = await fileServices.getFiles(id, since, limit);
+    return res.status(response.error ? 400 : 200).json(response);
+  } catch (error) {
+    console.error("getFiles error:", error);
+    return res
+      .status(500)
+      .json({ error: 1, message: "Internal server error." });
+  }
 };
 
 /**
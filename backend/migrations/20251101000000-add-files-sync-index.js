@@ -0,0 +1,14 @@
+'use strict';
+/** @type {import('sequelize-cli').Migration} */
+module.exports = {
+  // Đồng bộ tăng dần GET /file/list?since=: lọc và sắp theo (userId, updatedAt, id)
+  async up(queryInterface, Sequelize) {
+    await queryInterface.addIndex('Files', ['userId', 'updatedAt', 'id'], {
+      name: 'files_user_id_updated_at_id',
+    });
+  },
+
+  async down(queryInterface, Sequelize) {
+    await queryInterface.removeIndex('Files', 'files_user_id_updated_at_id');
+  },
+};
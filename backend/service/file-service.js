@@ -1,3 +1,4 @@
+import { Op } from "sequelize";
 import { File } from "../models/index.js";
 
 export const uploadFile = async (userId, filename, filePath, aesKey) => {
@@ -5,9 +6,49 @@ export const uploadFile = async (userId, filename, filePath, aesKey) => {
   return { error: 0, message: "Tải lên thành công", file };
 };
 
-export const getFiles = async (userId) => {
-  const files = await File.findAll({ where: { userId } });
-  return { error: 0, files };
+const SYNC_PAGE_SIZE = 1000;
+const SYNC_MAX_PAGE_SIZE = 5000;
+
+/**
+ * Không có since: trả toàn bộ file như cũ.
+ * Có since (đồng bộ tăng dần, "" = từ đầu): các file có (updatedAt, id) sau cursor
+ * "<updatedAt ISO>|<id>", sắp theo (updatedAt, id), tối đa limit file,
+ * kèm cursor của file cuối và hasMore.
+ */
+export const getFiles = async (userId, since, limit) => {
+  if (since === undefined) {
+    const files = await File.findAll({ where: { userId } });
+    return { error: 0, files };
+  }
+
+  const where = { userId };
+  if (since) {
+    const [time, id] = String(since).split("|");
+    const at = new Date(time);
+    if (Number.isNaN(at.getTime()) || !Number.isInteger(Number(id))) {
+      return { error: 1, message: "Cursor không hợp lệ" };
+    }
+    where[Op.or] = [
+      { updatedAt: { [Op.gt]: at } },
+      { updatedAt: at, id: { [Op.gt]: Number(id) } },
+    ];
+  }
+
+  // limit không hợp lệ (âm, 0, lẻ, không phải số) -> kẹp về [1, SYNC_MAX_PAGE_SIZE]
+  const pageSize = Math.max(1, Math.min(Math.floor(Number(limit) || SYNC_PAGE_SIZE), SYNC_MAX_PAGE_SIZE));
+  const rows = await File.findAll({
+    where,
+    order: [
+      ["updatedAt", "ASC"],
+      ["id", "ASC"],
+    ],
+    limit: pageSize + 1,
+  });
+  const hasMore = rows.length > pageSize;
+  const files = hasMore ? rows.slice(0, pageSize) : rows;
+  const last = files[files.length - 1];
+  const cursor = last ? `${last.updatedAt.toISOString()}|${last.id}` : since;
+  return { error: 0, files, cursor, hasMore };
 };
 
 export const getFileById = async (fileId, userId) => {
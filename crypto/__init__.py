@@ -4,5 +4,9 @@
 __all__ = [
     'aes_encrypt',
     'aes_decrypt',
+    'aes_context',
+    'aes_ctr',
+    'aes_gcm',
+    'container',
     'cryptoRSA_test'
 ]
@@ -0,0 +1,255 @@
+"""
+Bitsliced AES (ECB) on Python big integers.
+A batch of N blocks is transposed into 128 N-bit integers (bit plane b of
+state byte k holds bit b of byte k of every block), so every round is a fixed
+sequence of &, ^ operations applied to all N blocks at once. The S-box is
+evaluated as a circuit: inversion x^254 in GF(2^8) by bitsliced multiplication
+and squaring, followed by the affine transform. ShiftRows is a reordering of
+the plane list and costs nothing. Interpreter overhead is paid per batch
+instead of per byte.
+Blocks go in and out via bytes.translate + int(s, 2) / format(x, 'b').
+"""
+import base64
+
+from crypto.aes_context import get_context
+from crypto.aes_decrypt import pkcs7_unpad
+
+# Số block mỗi batch (mỗi bit plane là số nguyên BATCH_BLOCKS bit)
+BATCH_BLOCKS = 4096
+
+_SHIFT_ROWS = [0, 5, 10, 15, 4, 9, 14, 3, 8, 13, 2, 7, 12, 1, 6, 11]
+_INV_SHIFT_ROWS = [0, 13, 10, 7, 4, 1, 14, 11, 8, 5, 2, 15, 12, 9, 6, 3]
+
+# _BIT_TABLES[b]: byte -> b'1'/b'0' theo bit b, để int(col.translate(...), 2) gom bit b của mọi block
+_BIT_TABLES = [
+    bytes.maketrans(bytes(range(256)), bytes(0x31 if (v >> b) & 1 else 0x30 for v in range(256)))
+    for b in range(8)
+]
+
+
+def _gmul(a: int, b: int) -> int:
+    p = 0
+    while b:
+        if b & 1:
+            p ^= a
+        a = (a << 1) ^ 0x11B if a & 0x80 else a << 1
+        b >>= 1
+    return p
+
+
+def _linear_map(f) -> list:
+    """Ma trận của ánh xạ tuyến tính f trên GF(2)^8: bit j của output = XOR các bit input trong map[j]"""
+    columns = [f(1 << i) for i in range(8)]
+    return [[i for i in range(8) if (columns[i] >> j) & 1] for j in range(8)]
+
+
+def _affine(x: int) -> int:
+    r = x
+    for s in range(1, 5):
+        r ^= ((x << s) | (x >> (8 - s))) & 0xFF
+    return r
+
+
+def _inv_affine(x: int) -> int:
+    r = 0
+    for s in (1, 3, 6):
+        r ^= ((x << s) | (x >> (8 - s))) & 0xFF
+    return r
+
+
+_SQUARE = _linear_map(lambda x: _gmul(x, x))
+_AFFINE = _linear_map(_affine)
+_INV_AFFINE = _linear_map(_inv_affine)
+# x^k mod (x^8 + x^4 + x^3 + x + 1) cho k = 8..14, dùng khi rút gọn tích
+_REDUCE = [[k for k in range(8, 15) if (_gmul(1 << (k - 7), 0x80) >> j) & 1] for j in range(8)]
+
+
+def _apply(matrix, a):
+    out = []
+    for rows in matrix:
+        v = 0
+        for i in rows:
+            v ^= a[i]
+        out.append(v)
+    return out
+
+
+def _mul(a, b):
+    """Nhân bitsliced trong GF(2^8): 64 AND + rút gọn"""
+    p = [0] * 15
+    for i in range(8):
+        ai = a[i]
+        for j in range(8):
+            p[i + j] ^= ai & b[j]
+    out = p[:8]
+    for j, ks in enumerate(_REDUCE):
+        v = out[j]
+        for k in ks:
+            v ^= p[k]
+        out[j] = v
+    return out
+
+
+def _square(a, times=1):
+    for _ in range(times):
+        a = _apply(_SQUARE, a)
+    return a
+
+
+def _invert(x):
+    """x^254 = x^-1 (0 -> 0); chuỗi lũy thừa: 4 phép nhân, bình phương là tuyến tính"""
+    x2 = _square(x)
+    x3 = _mul(x2, x)
+    x12 = _square(x3, 2)
+    x15 = _mul(x12, x3)
+    x240 = _square(x15, 4)
+    x252 = _mul(x240, x12)
+    return _mul(x252, x2)
+
+
+def _sub_byte(a, ones):
+    out = _apply(_AFFINE, _invert(a))
+    # Hằng số 0x63: bit 0, 1, 5, 6
+    for b in (0, 1, 5, 6):
+        out[b] ^= ones
+    return out
+
+
+def _inv_sub_byte(a, ones):
+    a = _apply(_INV_AFFINE, a)
+    # Hằng số 0x05: bit 0, 2
+    a[0] ^= ones
+    a[2] ^= ones
+    return _invert(a)
+
+
+def _xtime(a):
+    a7 = a[7]
+    return [a7, a[0] ^ a7, a[1], a[2] ^ a7, a[3] ^ a7, a[4], a[5], a[6]]
+
+
+def _xor(a, b):
+    return [x ^ y for x, y in zip(a, b)]
+
+
+def _mix_columns(state):
+    out = []
+    for c in range(0, 16, 4):
+        col = state[c:c + 4]
+        total = _xor(_xor(col[0], col[1]), _xor(col[2], col[3]))
+        for i in range(4):
+            a = col[i]
+            out.append(_xor(_xor(a, total), _xtime(_xor(a, col[(i + 1) % 4]))))
+    return out
+
+
+def _inv_mix_columns(state):
+    # InvMixColumns = MixColumns sau bước tiền xử lý nhân 4 (như aes_numpy)
+    pre = []
+    for c in range(0, 16, 4):
+        a0, a1, a2, a3 = state[c:c + 4]
+        u = _xtime(_xtime(_xor(a0, a2)))
+        v = _xtime(_xtime(_xor(a1, a3)))
+        pre += [_xor(a0, u), _xor(a1, v), _xor(a2, u), _xor(a3, v)]
+    return _mix_columns(pre)
+
+
+def _add_round_key(state, round_keys, rnd, ones):
+    rk = round_keys[rnd * 16:rnd * 16 + 16]
+    for k in range(16):
+        byte = rk[k]
+        if byte:
+            planes = state[k]
+            for b in range(8):
+                if (byte >> b) & 1:
+                    planes[b] ^= ones
+
+
+def _to_planes(data: bytes):
+    """N block -> 16 byte x 8 bit plane; block j nằm ở bit (N - 1 - j)"""
+    return [[int(data[k::16].translate(table), 2) for table in _BIT_TABLES] for k in range(16)]
+
+
+def _from_planes(state, n: int) -> bytes:
+    out = bytearray(16 * n)
+    # Mỗi ký tự '0'/'1' (0x30/0x31) AND 0x01 -> một byte 0/1, dịch sang vị trí bit b
+    low_bits = int.from_bytes(b"\x01" * n, 'big')
+    width = f'0{n}b'
+    for k in range(16):
+        v = 0
+        for b, plane in enumerate(state[k]):
+            v |= (int.from_bytes(format(plane, width).encode(), 'big') & low_bits) << b
+        out[k::16] = v.to_bytes(n, 'big')
+    return bytes(out)
+
+
+def _encrypt_batch(data: bytes, round_keys: bytes, Nr: int) -> bytes:
+    n = len(data) // 16
+    ones = (1 << n) - 1
+    state = _to_planes(data)
+    _add_round_key(state, round_keys, 0, ones)
+    for rnd in range(1, Nr + 1):
+        state = [_sub_byte(state[i], ones) for i in _SHIFT_ROWS]
+        if rnd != Nr:
+            state = _mix_columns(state)
+        _add_round_key(state, round_keys, rnd, ones)
+    return _from_planes(state, n)
+
+
+def _decrypt_batch(data: bytes, round_keys: bytes, Nr: int) -> bytes:
+    n = len(data) // 16
+    ones = (1 << n) - 1
+    state = _to_planes(data)
+    _add_round_key(state, round_keys, Nr, ones)
+    for rnd in range(Nr - 1, -1, -1):
+        state = [_inv_sub_byte(state[i], ones) for i in _INV_SHIFT_ROWS]
+        _add_round_key(state, round_keys, rnd, ones)
+        if rnd:
+            state = _inv_mix_columns(state)
+    return _from_planes(state, n)
+
+
+def _run(data, ctx, transform):
+    data = bytes(data)
+    if len(data) % 16 != 0:
+        raise ValueError("Data length must be multiple of 16 for ECB")
+    step = BATCH_BLOCKS * 16
+    return b"".join(
+        transform(data[start:start + step], ctx.round_keys, ctx.Nr)
+        for start in range(0, len(data), step)
+    )
+
+
+def encrypt_blocks(ctx, data: bytes) -> bytes:
+    """Mã hóa ECB toàn bộ buffer (cùng interface với aes_numpy.encrypt_blocks)"""
+    return _run(data, ctx, _encrypt_batch)
+
+
+def decrypt_blocks(ctx, data: bytes) -> bytes:
+    """Giải mã ECB toàn bộ buffer (cùng interface với aes_numpy.decrypt_blocks)"""
+    return _run(data, ctx, _decrypt_batch)
+
+
+def encrypt_into(dst, src, ctx) -> None:
+    n = len(src)
+    memoryview(dst)[:n] = encrypt_blocks(ctx, src)
+
+
+def decrypt_into(dst, src, ctx) -> None:
+    n = len(src)
+    memoryview(dst)[:n] = decrypt_blocks(ctx, src)
+
+
+def encrypt_file_data_bitslice(data: bytes, aes_key_b64: str) -> bytes:
+    """Giống encrypt_file_data (ECB + PKCS7) nhưng dùng bitsliced engine"""
+    ctx = get_context(base64.b64decode(aes_key_b64))
+    pad_len = 16 - (len(data) % 16)
+    return encrypt_blocks(ctx, data + bytes([pad_len]) * pad_len)
+
+
+def decrypt_file_data_bitslice(ciphertext: bytes, aes_key_b64: str) -> bytes:
+    """Giống decrypt_file_data nhưng dùng bitsliced engine"""
+    if len(ciphertext) % 16 != 0:
+        raise ValueError("Ciphertext length must be multiple of 16 for ECB")
+    ctx = get_context(base64.b64decode(aes_key_b64))
+    return pkcs7_unpad(decrypt_blocks(ctx, ciphertext))
@@ -0,0 +1,149 @@
+"""
+Reusable AES cipher context.
+The key is expanded once into flat round key words (T-table engine) and flat
+round key bytes; contexts are kept in a small LRU cache keyed by key bytes so
+repeated calls with the same key skip key expansion.
+"""
+import struct
+from functools import lru_cache
+
+from crypto.aes_encrypt import S_BOX, TE0, TE1, TE2, TE3, key_expansion, key_expansion_words
+from crypto.aes_decrypt import INV_S_BOX, TD0, TD1, TD2, TD3, inv_key_expansion, inv_key_expansion_words
+
+# Số bytes xử lý mỗi lần unpack/pack (bội số của 16)
+CHUNK_SIZE = 64 * 1024
+CONTEXT_CACHE_SIZE = 32
+_CHUNK_STRUCT = struct.Struct('>%dI' % (CHUNK_SIZE // 4))
+
+
+class AESContext:
+    __slots__ = ('key', 'Nr', 'enc_words', 'dec_words', 'round_keys', 'dec_round_keys')
+
+    def __init__(self, key: bytes):
+        enc_words, Nr = key_expansion_words(key)
+        key_schedule, _ = key_expansion(key)
+        self.key = bytes(key)
+        self.Nr = Nr
+        self.enc_words = tuple(enc_words)
+        self.dec_words = tuple(inv_key_expansion_words(enc_words, Nr))
+        # Round keys dạng bytes phẳng: 16 bytes mỗi round
+        self.round_keys = bytes(b for word in key_schedule for b in word)
+        # Round keys cho equivalent inverse cipher (InvMixColumns đã áp dụng sẵn)
+        self.dec_round_keys = bytes(inv_key_expansion(key_schedule, Nr))
+
+    def encrypt_blocks(self, data: bytes) -> bytes:
+        """Mã hóa ECB một buffer (độ dài phải là bội số của 16)"""
+        if len(data) % 16 != 0:
+            raise ValueError("Data length must be multiple of 16 for ECB")
+        return b"".join(self._run(data, self._encrypt_words))
+
+    def decrypt_blocks(self, data: bytes) -> bytes:
+        """Giải mã ECB một buffer (độ dài phải là bội số của 16)"""
+        if len(data) % 16 != 0:
+            raise ValueError("Ciphertext length must be multiple of 16 for ECB")
+        return b"".join(self._run(data, self._decrypt_words))
+
+    @staticmethod
+    def _run_into(dst, src, transform):
+        n = len(src)
+        if n % 16 != 0:
+            raise ValueError("Data length must be multiple of 16 for ECB")
+        if len(dst) < n:
+            raise ValueError("Destination buffer too small")
+        full = _CHUNK_STRUCT
+        for start in range(0, n, CHUNK_SIZE):
+            st = full if n - start >= CHUNK_SIZE else struct.Struct('>%dI' % ((n - start) // 4))
+            # unpack_from/pack_into làm việc trực tiếp trên buffer, không tạo bytes tạm
+            st.pack_into(dst, start, *transform(st.unpack_from(src, start)))
+
+    @staticmethod
+    def _run(data, transform):
+        view = memoryview(data)
+        for start in range(0, len(view), CHUNK_SIZE):
+            chunk = view[start:start + CHUNK_SIZE]
+            fmt = '>%dI' % (len(chunk) // 4)
+            yield struct.pack(fmt, *transform(struct.unpack(fmt, chunk)))
+
+    def _encrypt_words(self, words):
+        te0, te1, te2, te3, sb = TE0, TE1, TE2, TE3, S_BOX
+        rk = self.enc_words
+        Nr = self.Nr
+        last = Nr * 4
+        out = []
+        append = out.append
+        for i in range(0, len(words), 4):
+            s0 = words[i] ^ rk[0]
+            s1 = words[i + 1] ^ rk[1]
+            s2 = words[i + 2] ^ rk[2]
+            s3 = words[i + 3] ^ rk[3]
+            for k in range(4, last, 4):
+                t0 = te0[s0 >> 24] ^ te1[(s1 >> 16) & 0xFF] ^ te2[(s2 >> 8) & 0xFF] ^ te3[s3 & 0xFF] ^ rk[k]
+                t1 = te0[s1 >> 24] ^ te1[(s2 >> 16) & 0xFF] ^ te2[(s3 >> 8) & 0xFF] ^ te3[s0 & 0xFF] ^ rk[k + 1]
+                t2 = te0[s2 >> 24] ^ te1[(s3 >> 16) & 0xFF] ^ te2[(s0 >> 8) & 0xFF] ^ te3[s1 & 0xFF] ^ rk[k + 2]
+                s3 = te0[s3 >> 24] ^ te1[(s0 >> 16) & 0xFF] ^ te2[(s1 >> 8) & 0xFF] ^ te3[s2 & 0xFF] ^ rk[k + 3]
+                s0, s1, s2 = t0, t1, t2
+            append((sb[s0 >> 24] << 24 | sb[(s1 >> 16) & 0xFF] << 16
+                    | sb[(s2 >> 8) & 0xFF] << 8 | sb[s3 & 0xFF]) ^ rk[last])
+            append((sb[s1 >> 24] << 24 | sb[(s2 >> 16) & 0xFF] << 16
+                    | sb[(s3 >> 8) & 0xFF] << 8 | sb[s0 & 0xFF]) ^ rk[last + 1])
+            append((sb[s2 >> 24] << 24 | sb[(s3 >> 16) & 0xFF] << 16
+                    | sb[(s0 >> 8) & 0xFF] << 8 | sb[s1 & 0xFF]) ^ rk[last + 2])
+            append((sb[s3 >> 24] << 24 | sb[(s0 >> 16) & 0xFF] << 16
+                    | sb[(s1 >> 8) & 0xFF] << 8 | sb[s2 & 0xFF]) ^ rk[last + 3])
+        return out
+
+    def _decrypt_words(self, words):
+        td0, td1, td2, td3, sb = TD0, TD1, TD2, TD3, INV_S_BOX
+        rk = self.dec_words
+        Nr = self.Nr
+        last = Nr * 4
+        out = []
+        append = out.append
+        for i in range(0, len(words), 4):
+            s0 = words[i] ^ rk[0]
+            s1 = words[i + 1] ^ rk[1]
+            s2 = words[i + 2] ^ rk[2]
+            s3 = words[i + 3] ^ rk[3]
+            for k in range(4, last, 4):
+                t0 = td0[s0 >> 24] ^ td1[(s3 >> 16) & 0xFF] ^ td2[(s2 >> 8) & 0xFF] ^ td3[s1 & 0xFF] ^ rk[k]
+                t1 = td0[s1 >> 24] ^ td1[(s0 >> 16) & 0xFF] ^ td2[(s3 >> 8) & 0xFF] ^ td3[s2 & 0xFF] ^ rk[k + 1]
+                t2 = td0[s2 >> 24] ^ td1[(s1 >> 16) & 0xFF] ^ td2[(s0 >> 8) & 0xFF] ^ td3[s3 & 0xFF] ^ rk[k + 2]
+                s3 = td0[s3 >> 24] ^ td1[(s2 >> 16) & 0xFF] ^ td2[(s1 >> 8) & 0xFF] ^ td3[s0 & 0xFF] ^ rk[k + 3]
+                s0, s1, s2 = t0, t1, t2
+            append((sb[s0 >> 24] << 24 | sb[(s3 >> 16) & 0xFF] << 16
+                    | sb[(s2 >> 8) & 0xFF] << 8 | sb[s1 & 0xFF]) ^ rk[last])
+            append((sb[s1 >> 24] << 24 | sb[(s0 >> 16) & 0xFF] << 16
+                    | sb[(s3 >> 8) & 0xFF] << 8 | sb[s2 & 0xFF]) ^ rk[last + 1])
+            append((sb[s2 >> 24] << 24 | sb[(s1 >> 16) & 0xFF] << 16
+                    | sb[(s0 >> 8) & 0xFF] << 8 | sb[s3 & 0xFF]) ^ rk[last + 2])
+            append((sb[s3 >> 24] << 24 | sb[(s2 >> 16) & 0xFF] << 16
+                    | sb[(s1 >> 8) & 0xFF] << 8 | sb[s0 & 0xFF]) ^ rk[last + 3])
+        return out
+
+
+def encrypt_into(dst: memoryview, src: memoryview, ctx: AESContext) -> None:
+    """
+    Mã hóa ECB từ src vào dst (bytearray/mmap/memoryview ghi được).
+    dst có thể trùng với src (mã hóa tại chỗ).
+    """
+    ctx._run_into(dst, src, ctx._encrypt_words)
+
+
+def decrypt_into(dst: memoryview, src: memoryview, ctx: AESContext) -> None:
+    """Giải mã ECB từ src vào dst (không bỏ padding), cho phép dst trùng src"""
+    ctx._run_into(dst, src, ctx._decrypt_words)
+
+
+@lru_cache(maxsize=CONTEXT_CACHE_SIZE)
+def get_context(key: bytes) -> AESContext:
+    """Lấy AESContext cho key (cache LRU theo key bytes)"""
+    return AESContext(key)
+
+
+def clear_contexts() -> None:
+    """
+    Xóa cache AESContext (mỗi context giữ key AES thô và round keys).
+    Chỉ cache của process hiện tại; worker của aes_parallel có cache riêng,
+    mất khi shutdown_pool()
+    """
+    get_context.cache_clear()
@@ -0,0 +1,109 @@
+"""
+AES-CTR mode with random-access decryption.
+Counter block i is (IV + i) mod 2^128, where IV is a random 16-byte initial
+counter block stored at the start of the file. No padding is needed, any byte
+range can be decrypted by computing only the keystream blocks it covers, and
+chunks are independent so they parallelize the same way as ECB.
+The block engine is selectable (engine=...): any encrypt_blocks(ctx, data)
+function, e.g. aes_bitslice.encrypt_blocks; the default is crypto.backends.
+File layout: IV (16 bytes) || ciphertext (same length as plaintext).
+"""
+import os
+from itertools import repeat
+
+from crypto.aes_context import get_context
+from crypto.backends import get_backend
+from crypto.aes_parallel import get_pool, default_workers, split_chunks, PARALLEL_THRESHOLD
+
+IV_SIZE = 16
+CTR_CHUNK_SIZE = 1024 * 1024
+_COUNTER_MASK = (1 << 128) - 1
+
+
+def generate_iv() -> bytes:
+    return os.urandom(IV_SIZE)
+
+
+def keystream(ctx, iv: bytes, start_block: int, nblocks: int, engine=None) -> bytes:
+    """Keystream cho các block [start_block, start_block + nblocks)"""
+    base = int.from_bytes(iv, 'big') + start_block
+    counters = b"".join(
+        ((base + i) & _COUNTER_MASK).to_bytes(16, 'big') for i in range(nblocks)
+    )
+    return (engine or get_backend().encrypt_blocks)(ctx, counters)
+
+
+def ctr_xcrypt(data: bytes, key: bytes, iv: bytes, offset: int = 0, engine=None) -> bytes:
+    """
+    Mã hóa/giải mã CTR (cùng một phép XOR) cho data bắt đầu tại byte offset
+    trong luồng. offset không cần căn theo block.
+    """
+    if not data:
+        return b""
+    ctx = get_context(bytes(key))
+    start_block, skip = divmod(offset, 16)
+    nblocks = -(-(skip + len(data)) // 16)
+    ks = keystream(ctx, iv, start_block, nblocks, engine)[skip:skip + len(data)]
+    # XOR cả chunk bằng số nguyên lớn (nhanh hơn XOR từng byte)
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(ks, 'big')).to_bytes(len(data), 'big')
+
+
+def _ctr_chunk(key: bytes, iv: bytes, offset: int, data: bytes, engine) -> bytes:
+    return ctr_xcrypt(data, key, iv, offset, engine)
+
+
+def ctr_xcrypt_parallel(data: bytes, key: bytes, iv: bytes, offset: int = 0, workers: int = None,
+                        engine=None) -> bytes:
+    """Như ctr_xcrypt nhưng chia data cho process pool (xem aes_parallel)"""
+    if workers is None:
+        workers = default_workers()
+    key = bytes(key)
+    if workers <= 1 or len(data) < PARALLEL_THRESHOLD:
+        return ctr_xcrypt(data, key, iv, offset, engine)
+    view = memoryview(data)
+    ranges = split_chunks(len(data), workers * 4)
+    offsets = (offset + start for start, _ in ranges)
+    chunks = (bytes(view[start:end]) for start, end in ranges)
+    return b"".join(get_pool(workers).map(_ctr_chunk, repeat(key), repeat(iv), offsets, chunks, repeat(engine)))
+
+
+def _xcrypt_stream(reader, writer, key, iv, workers):
+    offset = 0
+    chunk_size = CTR_CHUNK_SIZE * max(1, workers or default_workers())
+    while True:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            return offset
+        writer.write(ctr_xcrypt_parallel(chunk, key, iv, offset, workers))
+        offset += len(chunk)
+
+
+def encrypt_file_ctr(input_file: str, output_file: str, key: bytes, workers: int = 1) -> None:
+    iv = generate_iv()
+    with open(input_file, "rb") as src, open(output_file, "wb") as dst:
+        dst.write(iv)
+        _xcrypt_stream(src, dst, key, iv, workers)
+
+
+def decrypt_file_ctr(enc_path: str, out_path: str, key: bytes, workers: int = 1) -> None:
+    with open(enc_path, "rb") as src, open(out_path, "wb") as dst:
+        iv = src.read(IV_SIZE)
+        if len(iv) != IV_SIZE:
+            raise ValueError("CTR file too short (missing IV)")
+        _xcrypt_stream(src, dst, key, iv, workers)
+
+
+def decrypt_range(path: str, offset: int, length: int, key: bytes) -> bytes:
+    """
+    Giải mã plaintext[offset:offset + length] của file CTR mà không cần
+    giải mã phần còn lại của file.
+    """
+    if offset < 0 or length < 0:
+        raise ValueError("offset and length must be non-negative")
+    with open(path, "rb") as f:
+        iv = f.read(IV_SIZE)
+        if len(iv) != IV_SIZE:
+            raise ValueError("CTR file too short (missing IV)")
+        f.seek(IV_SIZE + offset)
+        data = f.read(length)
+    return ctr_xcrypt(data, key, iv, offset)
@@ -1,7 +1,8 @@
 
+import os
 import sys
 import base64
-from crypto.aes_encrypt import key_expansion, add_round_key
+from crypto.aes_encrypt import S_BOX, key_expansion_words, add_round_key
 
 
 INV_S_BOX = [
@@ -51,15 +52,23 @@ def gf_mul(a: int, b: int) -> int:
     return res & 0xFF
 
 
+# Bảng nhân GF(2^8) cho InvMixColumns (thay cho vòng lặp gf_mul)
+MUL_9 = [gf_mul(a, 9) for a in range(256)]
+MUL_11 = [gf_mul(a, 11) for a in range(256)]
+MUL_13 = [gf_mul(a, 13) for a in range(256)]
+MUL_14 = [gf_mul(a, 14) for a in range(256)]
+
+
 def inv_mix_columns(state: list[int]) -> list[int]:
+    m9, m11, m13, m14 = MUL_9, MUL_11, MUL_13, MUL_14
     out = []
     for i in range(4):
         c0,c1,c2,c3 = state[i*4:(i+1)*4]
         out += [
-            (gf_mul(c0,14) ^ gf_mul(c1,11) ^ gf_mul(c2,13) ^ gf_mul(c3, 9)) & 0xFF,
-            (gf_mul(c0, 9) ^ gf_mul(c1,14) ^ gf_mul(c2,11) ^ gf_mul(c3,13)) & 0xFF,
-            (gf_mul(c0,13) ^ gf_mul(c1, 9) ^ gf_mul(c2,14) ^ gf_mul(c3,11)) & 0xFF,
-            (gf_mul(c0,11) ^ gf_mul(c1,13) ^ gf_mul(c2, 9) ^ gf_mul(c3,14)) & 0xFF
+            m14[c0] ^ m11[c1] ^ m13[c2] ^ m9[c3],
+            m9[c0] ^ m14[c1] ^ m11[c2] ^ m13[c3],
+            m13[c0] ^ m9[c1] ^ m14[c2] ^ m11[c3],
+            m11[c0] ^ m13[c1] ^ m9[c2] ^ m14[c3]
         ]
     return out
 
@@ -78,6 +87,94 @@ def aes_decrypt_block(block: bytes, key_schedule: list[list[int]], Nr: int) -> b
     return bytes(state)
 
 
+def inv_key_expansion(key_schedule: list[list[int]], Nr: int) -> list[int]:
+    """
+    Round keys cho equivalent inverse cipher: InvMixColumns đã được áp dụng sẵn
+    cho các round key ở giữa. Trả về list bytes phẳng, 16 bytes mỗi round,
+    theo thứ tự giải mã.
+    """
+    dec = sum(key_schedule[Nr*4:(Nr+1)*4], [])
+    for rnd in range(Nr-1, 0, -1):
+        dec += inv_mix_columns(sum(key_schedule[rnd*4:(rnd+1)*4], []))
+    dec += sum(key_schedule[0:4], [])
+    return dec
+
+
+def aes_equiv_decrypt_block(block: bytes, dec_round_keys: list[int], Nr: int) -> bytes:
+    """
+    Equivalent inverse cipher: cùng thứ tự bước như mã hóa
+    (InvSubBytes, InvShiftRows, InvMixColumns, AddRoundKey) với round keys
+    từ inv_key_expansion.
+    """
+    state = add_round_key(list(block), dec_round_keys[0:16])
+    for rnd in range(1, Nr):
+        state = inv_sub_bytes(state)
+        state = inv_shift_rows(state)
+        state = inv_mix_columns(state)
+        state = add_round_key(state, dec_round_keys[rnd*16:(rnd+1)*16])
+    state = inv_sub_bytes(state)
+    state = inv_shift_rows(state)
+    state = add_round_key(state, dec_round_keys[Nr*16:(Nr+1)*16])
+    return bytes(state)
+
+
+# ===== T-table engine (32-bit words) =====
+# TD tables merge InvSubBytes + InvShiftRows + InvMixColumns. They implement the
+# equivalent inverse cipher, so the middle round keys must go through
+# InvMixColumns first (see inv_key_expansion_words).
+
+def _build_td_tables():
+    td0 = []
+    for s in INV_S_BOX:
+        td0.append((MUL_14[s] << 24) | (MUL_9[s] << 16) | (MUL_13[s] << 8) | MUL_11[s])
+    td1 = [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in td0]
+    td2 = [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in td1]
+    td3 = [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in td2]
+    return td0, td1, td2, td3
+
+
+TD0, TD1, TD2, TD3 = _build_td_tables()
+
+
+def inv_key_expansion_words(round_words: list[int], Nr: int) -> list[int]:
+    """Round keys for the equivalent inverse cipher, in decryption order"""
+    dec = list(round_words[Nr * 4:(Nr + 1) * 4])
+    for rnd in range(Nr - 1, 0, -1):
+        for w in round_words[rnd * 4:(rnd + 1) * 4]:
+            # TDx[S_BOX[b]] cancels the inverse S-box, leaving InvMixColumns
+            dec.append(TD0[S_BOX[w >> 24]] ^ TD1[S_BOX[(w >> 16) & 0xFF]]
+                       ^ TD2[S_BOX[(w >> 8) & 0xFF]] ^ TD3[S_BOX[w & 0xFF]])
+    dec += round_words[0:4]
+    return dec
+
+
+def aes_decrypt_block_ttable(block: bytes, dec_words: list[int], Nr: int) -> bytes:
+    s0 = int.from_bytes(block[0:4], 'big') ^ dec_words[0]
+    s1 = int.from_bytes(block[4:8], 'big') ^ dec_words[1]
+    s2 = int.from_bytes(block[8:12], 'big') ^ dec_words[2]
+    s3 = int.from_bytes(block[12:16], 'big') ^ dec_words[3]
+    k = 4
+    for _ in range(1, Nr):
+        t0 = TD0[s0 >> 24] ^ TD1[(s3 >> 16) & 0xFF] ^ TD2[(s2 >> 8) & 0xFF] ^ TD3[s1 & 0xFF] ^ dec_words[k]
+        t1 = TD0[s1 >> 24] ^ TD1[(s0 >> 16) & 0xFF] ^ TD2[(s3 >> 8) & 0xFF] ^ TD3[s2 & 0xFF] ^ dec_words[k + 1]
+        t2 = TD0[s2 >> 24] ^ TD1[(s1 >> 16) & 0xFF] ^ TD2[(s0 >> 8) & 0xFF] ^ TD3[s3 & 0xFF] ^ dec_words[k + 2]
+        t3 = TD0[s3 >> 24] ^ TD1[(s2 >> 16) & 0xFF] ^ TD2[(s1 >> 8) & 0xFF] ^ TD3[s0 & 0xFF] ^ dec_words[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+    # Last round: InvShiftRows + InvSubBytes only
+    sb = INV_S_BOX
+    return b"".join((
+        ((sb[s0 >> 24] << 24 | sb[(s3 >> 16) & 0xFF] << 16 | sb[(s2 >> 8) & 0xFF] << 8 | sb[s1 & 0xFF])
+         ^ dec_words[k]).to_bytes(4, 'big'),
+        ((sb[s1 >> 24] << 24 | sb[(s0 >> 16) & 0xFF] << 16 | sb[(s3 >> 8) & 0xFF] << 8 | sb[s2 & 0xFF])
+         ^ dec_words[k + 1]).to_bytes(4, 'big'),
+        ((sb[s2 >> 24] << 24 | sb[(s1 >> 16) & 0xFF] << 16 | sb[(s0 >> 8) & 0xFF] << 8 | sb[s3 & 0xFF])
+         ^ dec_words[k + 2]).to_bytes(4, 'big'),
+        ((sb[s3 >> 24] << 24 | sb[(s2 >> 16) & 0xFF] << 16 | sb[(s1 >> 8) & 0xFF] << 8 | sb[s0 & 0xFF])
+         ^ dec_words[k + 3]).to_bytes(4, 'big'),
+    ))
+
+
 def pkcs7_unpad(data: bytes) -> bytes:
     if not data or len(data) % 16 != 0:
         raise ValueError("Ciphertext size invalid")
@@ -89,17 +186,26 @@ def pkcs7_unpad(data: bytes) -> bytes:
     return data[:-pad]
 
 
-def decrypt_file_with_plain_key(enc_path: str, out_path: str, aes_key: bytes) -> None:
-    key_schedule, Nr = key_expansion(aes_key)
-    ct = open(enc_path, "rb").read()
-    if len(ct) % 16 != 0:
+def decrypt_file_with_plain_key(enc_path: str, out_path: str, aes_key: bytes, workers: int = 1,
+                                use_mmap: bool = False) -> None:
+    """Giải mã file .enc: container v2 (file do app tạo) hoặc ECB thô (file cũ)"""
+    from crypto.container import is_container, read_container
+    if is_container(enc_path):
+        return read_container(enc_path, out_path, aes_key, workers=workers)
+    if use_mmap:
+        from crypto.aes_mmap import decrypt_file_mmap
+        return decrypt_file_mmap(enc_path, out_path, aes_key, workers)
+    from crypto.aes_stream import decrypt_stream
+    if os.path.getsize(enc_path) % 16 != 0:
         raise ValueError("Ciphertext length must be multiple of 16 for ECB")
-    pt_chunks = []
-    for i in range(0, len(ct), 16):
-        pt_chunks.append(aes_decrypt_block(ct[i:i+16], key_schedule, Nr))
-    pt = pkcs7_unpad(b"".join(pt_chunks))
-    with open(out_path, "wb") as f:
-        f.write(pt)
+    # Padding chỉ kiểm tra được ở block cuối: lỗi thì xóa plaintext đã ghi
+    try:
+        with open(enc_path, "rb") as src, open(out_path, "wb") as dst:
+            decrypt_stream(src, dst, aes_key, workers=workers)
+    except Exception:
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        raise
 
 
 def _parse_key_arg(key_arg: str) -> bytes:
@@ -119,26 +225,44 @@ def _parse_key_arg(key_arg: str) -> bytes:
     if len(k) in (16, 24, 32):
         return k
     raise ValueError("Invalid AES key: provide base64, hex, or raw key with correct length")
-def decrypt_file_data(ciphertext: bytes, aes_key_b64: str) -> bytes:
+def decrypt_file_data(ciphertext: bytes, aes_key_b64: str, workers: int = 1) -> bytes:
+    from crypto.aes_parallel import decrypt_blocks_parallel
+    from crypto.tracing import span
     key = base64.b64decode(aes_key_b64)
-    key_schedule, Nr = key_expansion(key)
     
-    plaintext = b""
-    for i in range(0, len(ciphertext), 16):
-        block = ciphertext[i:i+16]
-        decrypted = aes_decrypt_block(block, key_schedule, Nr)
-        plaintext += bytes(decrypted)
+    if len(ciphertext) % 16 != 0:
+        raise ValueError("Ciphertext size invalid")
+    with span("aes.decrypt_file_data", len(ciphertext)):
+        plaintext = decrypt_blocks_parallel(key, ciphertext, workers)
     
     return pkcs7_unpad(plaintext)
 
+
+def decrypt_file_data_ttable(ciphertext: bytes, aes_key_b64: str) -> bytes:
+    """Giống decrypt_file_data nhưng dùng T-table engine"""
+    if len(ciphertext) % 16 != 0:
+        raise ValueError("Ciphertext length must be multiple of 16 for ECB")
+    key = base64.b64decode(aes_key_b64)
+    round_words, Nr = key_expansion_words(key)
+    dec_words = inv_key_expansion_words(round_words, Nr)
+
+    plaintext = b"".join(
+        aes_decrypt_block_ttable(ciphertext[i:i + 16], dec_words, Nr)
+        for i in range(0, len(ciphertext), 16)
+    )
+    return pkcs7_unpad(plaintext)
+
 def main():
     if len(sys.argv) < 4:
-        print("Usage: aes_decrypt.py <enc_file> <out_file> <aes_key_base64|hex|raw>")
+        print("Usage: aes_decrypt.py <enc_file> <out_file> <aes_key_base64|hex|raw> [backend]")
         sys.exit(2)
     enc_path = sys.argv[1]
     out_path = sys.argv[2]
     key_arg = sys.argv[3]
     key = _parse_key_arg(key_arg)
+    if len(sys.argv) > 4:
+        from crypto.backends import set_default_backend
+        set_default_backend(sys.argv[4])
     decrypt_file_with_plain_key(enc_path, out_path, key)
 
 if __name__ == "__main__":
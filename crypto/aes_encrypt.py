@@ -113,20 +113,66 @@ def aes_encrypt_block(block, key_schedule, Nr):
     return state
 
 
-def encrypt_file(input_file, output_file, key):
+# ===== T-table engine (32-bit words) =====
+# Each TE table merges SubBytes + ShiftRows + MixColumns for one byte position
+# of a column; a full round becomes 16 lookups and 16 XORs on whole words.
+
+def _build_te_tables():
+    te0 = []
+    for s in S_BOX:
+        s2 = xtime(s)
+        te0.append((s2 << 24) | (s << 16) | (s << 8) | (s2 ^ s))
+    te1 = [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in te0]
+    te2 = [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in te1]
+    te3 = [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in te2]
+    return te0, te1, te2, te3
+
+
+TE0, TE1, TE2, TE3 = _build_te_tables()
+
+
+def key_expansion_words(key):
+    """Expand key into a flat list of 32-bit round key words (4 per round)"""
     key_schedule, Nr = key_expansion(key)
-    with open(input_file, "rb") as f:
-        plaintext = f.read()
-    # PKCS7 padding
-    pad_len = 16 - (len(plaintext) % 16)
-    plaintext += bytes([pad_len]) * pad_len
-    ciphertext = b""
-    for i in range(0, len(plaintext), 16):
-        block = plaintext[i:i + 16]
-        encrypted_block = aes_encrypt_block(block, key_schedule, Nr)
-        ciphertext += bytes(encrypted_block)
-    with open(output_file, "wb") as f:
-        f.write(ciphertext)
+    words = [(w[0] << 24) | (w[1] << 16) | (w[2] << 8) | w[3] for w in key_schedule]
+    return words, Nr
+
+
+def aes_encrypt_block_ttable(block, round_words, Nr) -> bytes:
+    s0 = int.from_bytes(block[0:4], 'big') ^ round_words[0]
+    s1 = int.from_bytes(block[4:8], 'big') ^ round_words[1]
+    s2 = int.from_bytes(block[8:12], 'big') ^ round_words[2]
+    s3 = int.from_bytes(block[12:16], 'big') ^ round_words[3]
+    k = 4
+    for _ in range(1, Nr):
+        t0 = TE0[s0 >> 24] ^ TE1[(s1 >> 16) & 0xFF] ^ TE2[(s2 >> 8) & 0xFF] ^ TE3[s3 & 0xFF] ^ round_words[k]
+        t1 = TE0[s1 >> 24] ^ TE1[(s2 >> 16) & 0xFF] ^ TE2[(s3 >> 8) & 0xFF] ^ TE3[s0 & 0xFF] ^ round_words[k + 1]
+        t2 = TE0[s2 >> 24] ^ TE1[(s3 >> 16) & 0xFF] ^ TE2[(s0 >> 8) & 0xFF] ^ TE3[s1 & 0xFF] ^ round_words[k + 2]
+        t3 = TE0[s3 >> 24] ^ TE1[(s0 >> 16) & 0xFF] ^ TE2[(s1 >> 8) & 0xFF] ^ TE3[s2 & 0xFF] ^ round_words[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+    # Last round: SubBytes + ShiftRows only
+    sb = S_BOX
+    return b"".join((
+        ((sb[s0 >> 24] << 24 | sb[(s1 >> 16) & 0xFF] << 16 | sb[(s2 >> 8) & 0xFF] << 8 | sb[s3 & 0xFF])
+         ^ round_words[k]).to_bytes(4, 'big'),
+        ((sb[s1 >> 24] << 24 | sb[(s2 >> 16) & 0xFF] << 16 | sb[(s3 >> 8) & 0xFF] << 8 | sb[s0 & 0xFF])
+         ^ round_words[k + 1]).to_bytes(4, 'big'),
+        ((sb[s2 >> 24] << 24 | sb[(s3 >> 16) & 0xFF] << 16 | sb[(s0 >> 8) & 0xFF] << 8 | sb[s1 & 0xFF])
+         ^ round_words[k + 2]).to_bytes(4, 'big'),
+        ((sb[s3 >> 24] << 24 | sb[(s0 >> 16) & 0xFF] << 16 | sb[(s1 >> 8) & 0xFF] << 8 | sb[s2 & 0xFF])
+         ^ round_words[k + 3]).to_bytes(4, 'big'),
+    ))
+
+
+def encrypt_file(input_file, output_file, key, workers=1, use_mmap=False):
+    if use_mmap:
+        from crypto.aes_mmap import encrypt_file_mmap
+        return encrypt_file_mmap(input_file, output_file, key, workers)
+    # Stream theo chunk: bộ nhớ không phụ thuộc kích thước file
+    from crypto.aes_stream import encrypt_stream
+    with open(input_file, "rb") as src, open(output_file, "wb") as dst:
+        encrypt_stream(src, dst, key, workers=workers)
 
 
 def _parse_key_arg(key_arg: str) -> bytes:
@@ -149,32 +195,49 @@ def _parse_key_arg(key_arg: str) -> bytes:
     if len(k) in (16, 24, 32):
         return k
     raise ValueError("Invalid AES key: provide base64, hex, or raw key with correct length")
-def encrypt_file_data(data: bytes, aes_key_b64: str) -> bytes:
+def encrypt_file_data(data: bytes, aes_key_b64: str, workers: int = 1) -> bytes:
     """
     Mã hóa dữ liệu bằng AES (ECB + PKCS7)
+    workers > 1: chia dữ liệu lớn cho nhiều process (xem aes_parallel)
     """
+    from crypto.aes_parallel import encrypt_blocks_parallel
+    from crypto.tracing import span
     key = base64.b64decode(aes_key_b64)
-    key_schedule, Nr = key_expansion(key)
     
     # PKCS7 padding
     pad_len = 16 - (len(data) % 16)
     data += bytes([pad_len]) * pad_len
     
-    ciphertext = b""
-    for i in range(0, len(data), 16):
-        block = data[i:i+16]
-        encrypted = aes_encrypt_block(block, key_schedule, Nr)
-        ciphertext += bytes(encrypted)
-    return ciphertext
+    with span("aes.encrypt_file_data", len(data)):
+        return encrypt_blocks_parallel(key, data, workers)
+
+
+def encrypt_file_data_ttable(data: bytes, aes_key_b64: str) -> bytes:
+    """
+    Giống encrypt_file_data nhưng dùng T-table engine (output giống hệt từng byte)
+    """
+    key = base64.b64decode(aes_key_b64)
+    round_words, Nr = key_expansion_words(key)
+
+    pad_len = 16 - (len(data) % 16)
+    data = data + bytes([pad_len]) * pad_len
+
+    return b"".join(
+        aes_encrypt_block_ttable(data[i:i + 16], round_words, Nr)
+        for i in range(0, len(data), 16)
+    )
 
 def main():
     if len(sys.argv) < 4:
-        print("Usage: aes_encrypt.py <input_file> <output_file> <aes_key_base64|hex|raw>")
+        print("Usage: aes_encrypt.py <input_file> <output_file> <aes_key_base64|hex|raw> [backend]")
         sys.exit(2)
     input_file = sys.argv[1]
     output_file = sys.argv[2]
     key_arg = sys.argv[3]
     key = _parse_key_arg(key_arg)
+    if len(sys.argv) > 4:
+        from crypto.backends import set_default_backend
+        set_default_backend(sys.argv[4])
     encrypt_file(input_file, output_file, key)
 
 
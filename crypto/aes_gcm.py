@@ -0,0 +1,186 @@
+"""
+AES-GCM authenticated encryption (single pass).
+Encryption is AES-CTR (see aes_ctr) and authentication is GHASH, computed with
+per-key 8-bit Shoup tables: 16 tables of 256 precomputed products, so
+multiplying a block by H is 16 lookups and XORs with no bit loop. The tag is
+produced in the same pass as encryption and checked while streaming decryption,
+so integrity costs one read of the data.
+File layout: IV (12 bytes) || ciphertext || tag (16 bytes).
+"""
+import os
+import hmac
+from functools import lru_cache
+
+from crypto.aes_context import get_context
+from crypto.aes_ctr import ctr_xcrypt
+
+IV_SIZE = 12
+TAG_SIZE = 16
+GCM_CHUNK_SIZE = 1024 * 1024
+# R = 11100001 || 0^120 (đa thức rút gọn của GF(2^128) theo thứ tự bit GCM)
+_R = 0xE1 << 120
+
+
+def _gf_mul_slow(x: int, y: int) -> int:
+    """Nhân trong GF(2^128) từng bit (chỉ dùng khi dựng bảng)"""
+    z = 0
+    v = y
+    for i in range(127, -1, -1):
+        if (x >> i) & 1:
+            z ^= v
+        v = (v >> 1) ^ _R if v & 1 else v >> 1
+    return z
+
+
+# RED[b]: b (8 bit thấp, hệ số x^120..x^127) nhân x^8 rồi rút gọn
+_RED = [_gf_mul_slow(b, 1 << 119) for b in range(256)]
+
+
+@lru_cache(maxsize=32)
+def _ghash_tables(h: int) -> tuple:
+    """
+    tables[j][b] = (byte b tại vị trí j của block) * H.
+    Bảng j+1 = bảng j nhân x^8 (dịch phải 8 bit + RED), không cần nhân chậm.
+    """
+    first = tuple(_gf_mul_slow(b << 120, h) for b in range(256))
+    tables = [first]
+    for _ in range(15):
+        prev = tables[-1]
+        tables.append(tuple((z >> 8) ^ _RED[z & 0xFF] for z in prev))
+    return tuple(tables)
+
+
+class GHASH:
+    __slots__ = ('_tables', '_y', '_buf')
+
+    def __init__(self, h: bytes):
+        self._tables = _ghash_tables(int.from_bytes(h, 'big'))
+        self._y = 0
+        self._buf = b""
+
+    def update(self, data: bytes) -> None:
+        if self._buf:
+            data = self._buf + bytes(data)
+        usable = len(data) - len(data) % 16
+        tables = self._tables
+        y = self._y
+        for i in range(0, usable, 16):
+            x = (y ^ int.from_bytes(data[i:i + 16], 'big')).to_bytes(16, 'big')
+            y = 0
+            for table, b in zip(tables, x):
+                y ^= table[b]
+        self._y = y
+        self._buf = bytes(data[usable:])
+
+    def pad(self) -> None:
+        """Kết thúc một phần (AAD hoặc ciphertext): pad block dở dang bằng 0"""
+        if self._buf:
+            self.update(bytes(16 - len(self._buf)))
+
+    def digest(self, aad_len: int, ct_len: int) -> int:
+        self.pad()
+        self.update((aad_len * 8).to_bytes(8, 'big') + (ct_len * 8).to_bytes(8, 'big'))
+        return self._y
+
+
+class _GCMState:
+    """Trạng thái chung cho mã hóa/giải mã GCM dạng stream"""
+    __slots__ = ('key', 'ctx', 'ctr_iv', 'j0', 'ghash', 'aad_len', 'ct_len')
+
+    def __init__(self, key: bytes, iv: bytes, aad: bytes):
+        if len(iv) != IV_SIZE:
+            raise ValueError("GCM IV must be 12 bytes")
+        self.key = bytes(key)
+        self.ctx = get_context(self.key)
+        self.j0 = bytes(iv) + b"\x00\x00\x00\x01"
+        # Counter đầu tiên cho dữ liệu là inc32(J0)
+        self.ctr_iv = bytes(iv) + b"\x00\x00\x00\x02"
+        self.ghash = GHASH(self.ctx.encrypt_blocks(bytes(16)))
+        self.ghash.update(aad)
+        self.ghash.pad()
+        self.aad_len = len(aad)
+        self.ct_len = 0
+
+    def xcrypt(self, data: bytes) -> bytes:
+        out = ctr_xcrypt(data, self.key, self.ctr_iv, self.ct_len)
+        self.ct_len += len(data)
+        return out
+
+    def tag(self) -> bytes:
+        s = self.ghash.digest(self.aad_len, self.ct_len)
+        ek_j0 = int.from_bytes(self.ctx.encrypt_blocks(self.j0), 'big')
+        return (s ^ ek_j0).to_bytes(16, 'big')
+
+
+class GCMEncryptor:
+    def __init__(self, key: bytes, iv: bytes, aad: bytes = b""):
+        self._state = _GCMState(key, iv, aad)
+
+    def update(self, data: bytes) -> bytes:
+        ct = self._state.xcrypt(data)
+        self._state.ghash.update(ct)
+        return ct
+
+    def finalize(self) -> bytes:
+        """Trả về tag 16 bytes"""
+        return self._state.tag()
+
+
+class GCMDecryptor:
+    def __init__(self, key: bytes, iv: bytes, aad: bytes = b""):
+        self._state = _GCMState(key, iv, aad)
+
+    def update(self, data: bytes) -> bytes:
+        self._state.ghash.update(data)
+        return self._state.xcrypt(data)
+
+    def verify(self, tag: bytes) -> None:
+        if not hmac.compare_digest(self._state.tag(), bytes(tag)):
+            raise ValueError("GCM tag mismatch: dữ liệu bị hỏng hoặc sai key")
+
+
+def gcm_encrypt(data: bytes, key: bytes, iv: bytes, aad: bytes = b"") -> tuple[bytes, bytes]:
+    enc = GCMEncryptor(key, iv, aad)
+    ct = enc.update(data)
+    return ct, enc.finalize()
+
+
+def gcm_decrypt(ciphertext: bytes, key: bytes, iv: bytes, tag: bytes, aad: bytes = b"") -> bytes:
+    dec = GCMDecryptor(key, iv, aad)
+    pt = dec.update(ciphertext)
+    dec.verify(tag)
+    return pt
+
+
+def encrypt_file_gcm(input_file: str, output_file: str, key: bytes, aad: bytes = b"") -> None:
+    iv = os.urandom(IV_SIZE)
+    enc = GCMEncryptor(key, iv, aad)
+    with open(input_file, "rb") as src, open(output_file, "wb") as dst:
+        dst.write(iv)
+        for chunk in iter(lambda: src.read(GCM_CHUNK_SIZE), b""):
+            dst.write(enc.update(chunk))
+        dst.write(enc.finalize())
+
+
+def decrypt_file_gcm(enc_path: str, out_path: str, key: bytes, aad: bytes = b"") -> None:
+    """Giải mã + xác thực trong một lần đọc; tag sai thì xóa file output và raise"""
+    size = os.path.getsize(enc_path)
+    if size < IV_SIZE + TAG_SIZE:
+        raise ValueError("GCM file too short")
+    remaining = size - IV_SIZE - TAG_SIZE
+    with open(enc_path, "rb") as src:
+        iv = src.read(IV_SIZE)
+        dec = GCMDecryptor(key, iv, aad)
+        try:
+            with open(out_path, "wb") as dst:
+                while remaining:
+                    chunk = src.read(min(GCM_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ValueError("GCM file truncated")
+                    remaining -= len(chunk)
+                    dst.write(dec.update(chunk))
+            dec.verify(src.read(TAG_SIZE))
+        except Exception:
+            if os.path.exists(out_path):
+                os.remove(out_path)
+            raise
@@ -0,0 +1,86 @@
+"""
+Memory-mapped file encryption (ECB + PKCS#7) for very large files.
+The output file is sized up front, input and output are mapped, and block
+ranges are transformed directly between the two maps so the page cache does
+the I/O. Parallel workers open and map the same files themselves, so chunks
+are never copied through pickling.
+"""
+import os
+import mmap
+
+from crypto.aes_context import get_context
+from crypto.aes_decrypt import pkcs7_unpad
+from crypto.backends import get_backend
+from crypto.aes_parallel import get_pool, default_workers, split_chunks, PARALLEL_THRESHOLD
+
+
+def _transform_range(in_path: str, out_path: str, key: bytes, start: int, end: int, decrypt: bool) -> None:
+    """Biến đổi [start, end) của in_path vào cùng vị trí trong out_path (chạy trong worker)"""
+    ctx = get_context(key)
+    backend = get_backend()
+    into = backend.decrypt_into if decrypt else backend.encrypt_into
+    with open(in_path, "rb") as fin, open(out_path, "r+b") as fout:
+        with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as src, \
+                mmap.mmap(fout.fileno(), 0, access=mmap.ACCESS_WRITE) as dst:
+            with memoryview(src) as src_view, memoryview(dst) as dst_view:
+                into(dst_view[start:end], src_view[start:end], ctx)
+            dst.flush()
+
+
+def _transform_ranges(in_path, out_path, key, length, workers, decrypt):
+    if length == 0:
+        return
+    if workers is None:
+        workers = default_workers()
+    if workers <= 1 or length < PARALLEL_THRESHOLD:
+        _transform_range(in_path, out_path, key, 0, length, decrypt)
+        return
+    pool = get_pool(workers)
+    futures = [
+        pool.submit(_transform_range, in_path, out_path, key, start, end, decrypt)
+        for start, end in split_chunks(length, workers * 4)
+    ]
+    for future in futures:
+        future.result()
+
+
+def _read_at(path: str, offset: int, size: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def encrypt_file_mmap(input_file: str, output_file: str, key: bytes, workers: int = 1) -> None:
+    key = bytes(key)
+    ctx = get_context(key)
+    size = os.path.getsize(input_file)
+    full = size - size % 16
+    # Độ dài ciphertext biết trước: plaintext + padding
+    pad_len = 16 - size % 16
+    with open(output_file, "wb") as f:
+        f.truncate(size + pad_len)
+    _transform_ranges(input_file, output_file, key, full, workers, decrypt=False)
+    tail = bytearray(_read_at(input_file, full, size - full) + bytes([pad_len]) * pad_len)
+    get_backend().encrypt_into(tail, tail, ctx)
+    with open(output_file, "r+b") as f:
+        f.seek(full)
+        f.write(tail)
+
+
+def decrypt_file_mmap(enc_path: str, out_path: str, aes_key: bytes, workers: int = 1) -> None:
+    key = bytes(aes_key)
+    ctx = get_context(key)
+    size = os.path.getsize(enc_path)
+    if size == 0 or size % 16 != 0:
+        raise ValueError("Ciphertext length must be multiple of 16 for ECB")
+    # Giải mã block cuối trước để biết độ dài plaintext
+    last = bytearray(_read_at(enc_path, size - 16, 16))
+    get_backend().decrypt_into(last, last, ctx)
+    last = pkcs7_unpad(bytes(last))
+    body = size - 16
+    with open(out_path, "wb") as f:
+        f.truncate(body + len(last))
+    _transform_ranges(enc_path, out_path, key, body, workers, decrypt=True)
+    with open(out_path, "r+b") as f:
+        f.seek(body)
+        f.write(last)
@@ -0,0 +1,129 @@
+"""
+NumPy-vectorized AES (ECB).
+The buffer is viewed as an (N, 16) uint8 array and every round runs across all
+N blocks at once: S-box by fancy indexing, ShiftRows as a column permutation,
+MixColumns with a vectorized xtime. Falls back to the pure-Python AESContext
+when NumPy is not installed.
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPy là tùy chọn
+    np = None
+
+from crypto.aes_encrypt import S_BOX
+from crypto.aes_decrypt import INV_S_BOX
+from crypto import aes_context
+
+HAS_NUMPY = np is not None
+
+# Số bytes mỗi lần xử lý (giới hạn bộ nhớ tạm của các mảng trung gian)
+CHUNK_SIZE = 4 * 1024 * 1024
+
+if HAS_NUMPY:
+    _S_BOX = np.array(S_BOX, dtype=np.uint8)
+    _INV_S_BOX = np.array(INV_S_BOX, dtype=np.uint8)
+    _SHIFT_ROWS = np.array([0, 5, 10, 15, 4, 9, 14, 3, 8, 13, 2, 7, 12, 1, 6, 11])
+    _INV_SHIFT_ROWS = np.array([0, 13, 10, 7, 4, 1, 14, 11, 8, 5, 2, 15, 12, 9, 6, 3])
+
+
+def _xtime(a):
+    return (a << 1) ^ ((a >> 7) * np.uint8(0x1B))
+
+
+def _mix_columns(state):
+    cols = state.reshape(-1, 4, 4)
+    total = cols[:, :, 0] ^ cols[:, :, 1] ^ cols[:, :, 2] ^ cols[:, :, 3]
+    rotated = np.roll(cols, -1, axis=2)
+    # out_i = a_i ^ (a0^a1^a2^a3) ^ xtime(a_i ^ a_(i+1))
+    return (cols ^ total[:, :, None] ^ _xtime(cols ^ rotated)).reshape(-1, 16)
+
+
+def _inv_mix_columns(state):
+    cols = state.reshape(-1, 4, 4).copy()
+    # InvMixColumns = MixColumns sau bước tiền xử lý nhân 4 (xtime hai lần)
+    u = _xtime(_xtime(cols[:, :, 0] ^ cols[:, :, 2]))
+    v = _xtime(_xtime(cols[:, :, 1] ^ cols[:, :, 3]))
+    cols[:, :, 0] ^= u
+    cols[:, :, 1] ^= v
+    cols[:, :, 2] ^= u
+    cols[:, :, 3] ^= v
+    return _mix_columns(cols.reshape(-1, 16))
+
+
+def _encrypt_array(state, rk, Nr):
+    state = state ^ rk[0]
+    for rnd in range(1, Nr):
+        state = _S_BOX[state][:, _SHIFT_ROWS]
+        state = _mix_columns(state)
+        state ^= rk[rnd]
+    state = _S_BOX[state][:, _SHIFT_ROWS]
+    state ^= rk[Nr]
+    return state
+
+
+def _decrypt_array(state, drk, Nr):
+    # Equivalent inverse cipher với round keys đã qua InvMixColumns
+    state = state ^ drk[0]
+    for rnd in range(1, Nr):
+        state = _INV_S_BOX[state][:, _INV_SHIFT_ROWS]
+        state = _inv_mix_columns(state)
+        state ^= drk[rnd]
+    state = _INV_S_BOX[state][:, _INV_SHIFT_ROWS]
+    state ^= drk[Nr]
+    return state
+
+
+def _run(data, round_keys, Nr, transform):
+    rk = np.frombuffer(round_keys, dtype=np.uint8).reshape(Nr + 1, 16)
+    view = memoryview(data)
+    out = []
+    for start in range(0, len(view), CHUNK_SIZE):
+        chunk = np.frombuffer(view[start:start + CHUNK_SIZE], dtype=np.uint8).reshape(-1, 16)
+        out.append(transform(chunk, rk, Nr).tobytes())
+    return b"".join(out)
+
+
+def _run_into(dst, src, round_keys, Nr, transform):
+    n = len(src)
+    if n % 16 != 0:
+        raise ValueError("Data length must be multiple of 16 for ECB")
+    if n == 0:
+        return
+    rk = np.frombuffer(round_keys, dtype=np.uint8).reshape(Nr + 1, 16)
+    src_arr = np.frombuffer(src, dtype=np.uint8, count=n)
+    dst_arr = np.frombuffer(dst, dtype=np.uint8, count=n)
+    for start in range(0, n, CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, n)
+        dst_arr[start:end] = transform(src_arr[start:end].reshape(-1, 16), rk, Nr).reshape(-1)
+
+
+def encrypt_into(dst, src, ctx) -> None:
+    """Như aes_context.encrypt_into nhưng dùng NumPy (fallback: bản pure-Python)"""
+    if not HAS_NUMPY:
+        return aes_context.encrypt_into(dst, src, ctx)
+    _run_into(dst, src, ctx.round_keys, ctx.Nr, _encrypt_array)
+
+
+def decrypt_into(dst, src, ctx) -> None:
+    """Như aes_context.decrypt_into nhưng dùng NumPy (fallback: bản pure-Python)"""
+    if not HAS_NUMPY:
+        return aes_context.decrypt_into(dst, src, ctx)
+    _run_into(dst, src, ctx.dec_round_keys, ctx.Nr, _decrypt_array)
+
+
+def encrypt_blocks(ctx, data: bytes) -> bytes:
+    """Mã hóa ECB toàn bộ buffer bằng NumPy (fallback: ctx.encrypt_blocks)"""
+    if not HAS_NUMPY:
+        return ctx.encrypt_blocks(data)
+    if len(data) % 16 != 0:
+        raise ValueError("Data length must be multiple of 16 for ECB")
+    return _run(data, ctx.round_keys, ctx.Nr, _encrypt_array)
+
+
+def decrypt_blocks(ctx, data: bytes) -> bytes:
+    """Giải mã ECB toàn bộ buffer bằng NumPy (fallback: ctx.decrypt_blocks)"""
+    if not HAS_NUMPY:
+        return ctx.decrypt_blocks(data)
+    if len(data) % 16 != 0:
+        raise ValueError("Ciphertext length must be multiple of 16 for ECB")
+    return _run(data, ctx.dec_round_keys, ctx.Nr, _decrypt_array)
@@ -0,0 +1,101 @@
+"""
+Multi-core AES (ECB) using a persistent process pool.
+The buffer is split into block-aligned chunks which are processed in worker
+processes and reassembled in order. Workers stay alive across operations and
+keep their own AESContext cache, so each worker expands a given key only once.
+Chunks are transformed with the engine chosen by crypto.backends.
+One pool is kept per (worker count, pinned backend); a pool is never replaced
+while another thread may still be using it, and its workers start with the
+backend that was pinned (set_default_backend) when it was created. Workers are started with forkserver/spawn, not
+fork, because the pool is created from the multithreaded PyQt process.
+"""
+import os
+import atexit
+import threading
+import multiprocessing
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+from crypto.aes_context import get_context
+from crypto.backends import get_backend, set_default_backend, ENV_VAR
+
+# Dưới ngưỡng này chạy trực tiếp trong process hiện tại (chi phí IPC không đáng)
+PARALLEL_THRESHOLD = 2 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+
+# forkserver nếu có (Linux), không thì spawn (Windows, macOS)
+MP_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def mp_context():
+    """Context multiprocessing cho các process pool (không fork từ process nhiều thread)"""
+    return multiprocessing.get_context(MP_START_METHOD)
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """Lấy process pool dùng chung cho số worker này (tạo khi cần, giữ tới shutdown_pool)"""
+    # Worker không kế thừa thay đổi sau khi forkserver đã chạy: truyền backend đang ghim
+    backend = os.environ.get(ENV_VAR) or None
+    with _pool_lock:
+        pool = _pools.get((workers, backend))
+        if pool is None:
+            pool = _pools[(workers, backend)] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=mp_context(),
+                initializer=set_default_backend, initargs=(backend,))
+        return pool
+
+
+def shutdown_pool() -> None:
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+atexit.register(shutdown_pool)
+
+
+def _encrypt_chunk(key: bytes, chunk: bytes) -> bytes:
+    return get_backend().encrypt_blocks(get_context(key), chunk)
+
+
+def _decrypt_chunk(key: bytes, chunk: bytes) -> bytes:
+    return get_backend().decrypt_blocks(get_context(key), chunk)
+
+
+def split_chunks(length: int, parts: int) -> list[tuple[int, int]]:
+    """Chia [0, length) thành các khoảng (start, end) căn theo block 16 bytes"""
+    size = max(MIN_CHUNK_SIZE, -(-length // parts))
+    size += -size % 16
+    return [(start, min(start + size, length)) for start in range(0, length, size)]
+
+
+def _run(func, data, key: bytes, workers):
+    if workers is None:
+        workers = default_workers()
+    if len(data) % 16 != 0:
+        raise ValueError("Data length must be multiple of 16 for ECB")
+    if workers <= 1 or len(data) < PARALLEL_THRESHOLD:
+        return func(key, data)
+    view = memoryview(data)
+    # Mỗi worker nhận vài chunk để cân bằng tải
+    chunks = (bytes(view[start:end]) for start, end in split_chunks(len(data), workers * 4))
+    return b"".join(get_pool(workers).map(func, repeat(key), chunks))
+
+
+def encrypt_blocks_parallel(key: bytes, data: bytes, workers: int = None) -> bytes:
+    """Mã hóa ECB buffer đã padding trên nhiều core"""
+    return _run(_encrypt_chunk, data, bytes(key), workers)
+
+
+def decrypt_blocks_parallel(key: bytes, data: bytes, workers: int = None) -> bytes:
+    """Giải mã ECB buffer trên nhiều core (chưa bỏ padding)"""
+    return _run(_decrypt_chunk, data, bytes(key), workers)
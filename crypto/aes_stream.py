@@ -0,0 +1,127 @@
+"""
+Constant-memory streaming AES (ECB + PKCS#7).
+Data is processed in fixed-size chunks; padding is applied only to the final
+chunk, and on decryption the last block is held back until the end of input
+so it can be unpadded. Peak memory stays at a few chunks regardless of file size.
+encrypt_stream/decrypt_stream read with readinto into one reusable buffer and
+transform it in place, so the I/O path has no per-block allocations.
+"""
+from crypto.aes_context import get_context
+from crypto.aes_decrypt import pkcs7_unpad
+from crypto.aes_parallel import encrypt_blocks_parallel, decrypt_blocks_parallel
+from crypto.backends import get_backend
+
+# Kích thước chunk đọc/ghi (bội số của 16)
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Chunk lớn hơn khi chạy nhiều process để mỗi worker có đủ việc
+PARALLEL_STREAM_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def iter_encrypt(chunks, key: bytes, workers: int = 1):
+    """Generator: nhận các chunk plaintext bất kỳ độ dài, trả về các chunk ciphertext"""
+    key = bytes(key)
+    pending = b""
+    for chunk in chunks:
+        if pending:
+            chunk = pending + chunk
+        usable = len(chunk) - len(chunk) % 16
+        if usable:
+            yield encrypt_blocks_parallel(key, chunk[:usable], workers)
+        pending = chunk[usable:]
+    # PKCS7 padding chỉ cho block cuối
+    pad_len = 16 - len(pending)
+    yield encrypt_blocks_parallel(key, pending + bytes([pad_len]) * pad_len, 1)
+
+
+def iter_decrypt(chunks, key: bytes, workers: int = 1):
+    """Generator: nhận các chunk ciphertext, trả về các chunk plaintext đã bỏ padding"""
+    key = bytes(key)
+    pending = b""
+    for chunk in chunks:
+        if pending:
+            chunk = pending + chunk
+        # Giữ lại block cuối cùng (có thể chứa padding) cho tới khi hết input
+        usable = len(chunk) - len(chunk) % 16
+        if usable == len(chunk):
+            usable -= 16
+        if usable > 0:
+            yield decrypt_blocks_parallel(key, chunk[:usable], workers)
+            pending = chunk[usable:]
+        else:
+            pending = chunk
+    if len(pending) != 16:
+        raise ValueError("Ciphertext length must be multiple of 16 for ECB")
+    yield pkcs7_unpad(decrypt_blocks_parallel(key, pending, 1))
+
+
+def _chunk_size(chunk_size, workers):
+    if chunk_size is None:
+        chunk_size = PARALLEL_STREAM_CHUNK_SIZE if workers != 1 else STREAM_CHUNK_SIZE
+    if chunk_size < 32 or chunk_size % 16 != 0:
+        raise ValueError("chunk_size must be a multiple of 16 (>= 32)")
+    return chunk_size
+
+
+def _fill(reader, view) -> int:
+    """readinto cho tới khi đầy buffer hoặc hết file"""
+    total = 0
+    while total < len(view):
+        n = reader.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+
+def _transform(view, key, ctx, workers, into, parallel):
+    """Biến đổi view tại chỗ (1 process) hoặc trả về bytes mới (nhiều process)"""
+    if workers == 1:
+        into(view, view, ctx)
+        return view
+    return parallel(key, view, workers)
+
+
+def encrypt_stream(reader, writer, key: bytes, chunk_size: int = None, workers: int = 1) -> int:
+    """Mã hóa từ file object reader sang writer, trả về số bytes đã ghi"""
+    key = bytes(key)
+    ctx = get_context(key)
+    backend = get_backend()
+    chunk_size = _chunk_size(chunk_size, workers)
+    view = memoryview(bytearray(chunk_size))
+    written = 0
+    n = _fill(reader, view)
+    while n == chunk_size:
+        writer.write(_transform(view, key, ctx, workers, backend.encrypt_into, encrypt_blocks_parallel))
+        written += chunk_size
+        n = _fill(reader, view)
+    # Chunk cuối (n < chunk_size): PKCS7 padding ngay trong buffer
+    pad_len = 16 - n % 16
+    view[n:n + pad_len] = bytes([pad_len]) * pad_len
+    tail = view[:n + pad_len]
+    writer.write(_transform(tail, key, ctx, workers, backend.encrypt_into, encrypt_blocks_parallel))
+    return written + len(tail)
+
+
+def decrypt_stream(reader, writer, key: bytes, chunk_size: int = None, workers: int = 1) -> int:
+    """Giải mã từ file object reader sang writer, trả về số bytes đã ghi"""
+    key = bytes(key)
+    ctx = get_context(key)
+    backend = get_backend()
+    chunk_size = _chunk_size(chunk_size, workers)
+    view = memoryview(bytearray(chunk_size))
+    written = 0
+    n = _fill(reader, view)
+    while n == chunk_size:
+        # Có thể còn dữ liệu: giữ lại block cuối, đưa nó lên đầu buffer
+        body = view[:chunk_size - 16]
+        writer.write(_transform(body, key, ctx, workers, backend.decrypt_into, decrypt_blocks_parallel))
+        written += len(body)
+        view[:16] = view[chunk_size - 16:]
+        n = 16 + _fill(reader, view[16:])
+    if n == 0 or n % 16 != 0:
+        raise ValueError("Ciphertext length must be multiple of 16 for ECB")
+    data = _transform(view[:n], key, ctx, workers, backend.decrypt_into, decrypt_blocks_parallel)
+    writer.write(data[:n - 16])
+    last = pkcs7_unpad(data[n - 16:])
+    writer.write(last)
+    return written + n - 16 + len(last)
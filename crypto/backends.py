@@ -0,0 +1,185 @@
+"""
+AES block engine registry.
+Every bulk path (parallel ECB, streaming, mmap, CTR/GCM keystream) asks
+get_backend() for its block functions instead of importing one engine.
+Backends, fastest first:
+    cryptography  system OpenSSL via the `cryptography` package (optional)
+    numpy         vectorized engine, aes_numpy (optional)
+    bitslice      big-integer bitsliced engine, aes_bitslice
+    ttable        pure-Python T-table engine, AESContext
+    reference     byte-oriented aes_encrypt_block/aes_decrypt_block
+The fastest available backend is used unless one is pinned with
+set_default_backend() or the CRYPTO_AES_BACKEND environment variable. Each
+backend must pass the FIPS-197 known-answer tests before its first use.
+"""
+import os
+
+from crypto.aes_encrypt import aes_encrypt_block, key_expansion
+from crypto.aes_decrypt import aes_decrypt_block
+from crypto.aes_context import get_context
+from crypto import aes_context, aes_numpy, aes_bitslice
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:  # cryptography là tùy chọn
+    Cipher = None
+
+ENV_VAR = "CRYPTO_AES_BACKEND"
+# Buffer nhỏ hơn ngưỡng này: bitslice dùng T-table (chi phí chuyển vị không đáng)
+BITSLICE_MIN_SIZE = 64 * 16
+
+# FIPS-197 Appendix C: (key, plaintext, ciphertext)
+_KNOWN_ANSWERS = [
+    (bytes(range(16)), "00112233445566778899aabbccddeeff", "69c4e0d86a7b0430d8cdb78070b4c55a"),
+    (bytes(range(24)), "00112233445566778899aabbccddeeff", "dda97ca4864cdfe06eaf70a0ec0d7191"),
+    (bytes(range(32)), "00112233445566778899aabbccddeeff", "8ea2b7ca516745bfeafc49904b496089"),
+]
+# Lặp lại vector để kiểm tra cả đường xử lý nhiều block (batch, vector hóa)
+_SELF_TEST_BLOCKS = 80
+
+
+class AESBackend:
+    __slots__ = ('name', 'priority', 'encrypt_blocks', 'decrypt_blocks', 'encrypt_into', 'decrypt_into', 'verified')
+
+    def __init__(self, name, priority, encrypt_blocks, decrypt_blocks, encrypt_into=None, decrypt_into=None):
+        self.name = name
+        self.priority = priority
+        # encrypt_blocks(ctx, data) -> bytes, encrypt_into(dst, src, ctx): ECB không padding
+        self.encrypt_blocks = encrypt_blocks
+        self.decrypt_blocks = decrypt_blocks
+        self.encrypt_into = encrypt_into or _into(encrypt_blocks)
+        self.decrypt_into = decrypt_into or _into(decrypt_blocks)
+        self.verified = False
+
+    def self_test(self) -> None:
+        """Known-answer test FIPS-197; raise RuntimeError nếu sai"""
+        for key, pt_hex, ct_hex in _KNOWN_ANSWERS:
+            ctx = get_context(key)
+            pt = bytes.fromhex(pt_hex) * _SELF_TEST_BLOCKS
+            ct = bytes.fromhex(ct_hex) * _SELF_TEST_BLOCKS
+            buf = bytearray(pt)
+            self.encrypt_into(buf, buf, ctx)
+            if self.encrypt_blocks(ctx, pt) != ct or buf != ct:
+                raise RuntimeError(f"AES backend '{self.name}' failed encryption self-test (AES-{len(key) * 8})")
+            self.decrypt_into(buf, buf, ctx)
+            if self.decrypt_blocks(ctx, ct) != pt or buf != pt:
+                raise RuntimeError(f"AES backend '{self.name}' failed decryption self-test (AES-{len(key) * 8})")
+        self.verified = True
+
+
+def _into(blocks):
+    def into(dst, src, ctx):
+        memoryview(dst)[:len(src)] = blocks(ctx, bytes(src))
+    return into
+
+
+def _reference_encrypt(ctx, data):
+    key_schedule, Nr = key_expansion(ctx.key)
+    return b"".join(bytes(aes_encrypt_block(data[i:i + 16], key_schedule, Nr)) for i in range(0, len(data), 16))
+
+
+def _reference_decrypt(ctx, data):
+    key_schedule, Nr = key_expansion(ctx.key)
+    return b"".join(aes_decrypt_block(data[i:i + 16], key_schedule, Nr) for i in range(0, len(data), 16))
+
+
+def _ttable_encrypt(ctx, data):
+    return ctx.encrypt_blocks(bytes(data))
+
+
+def _ttable_decrypt(ctx, data):
+    return ctx.decrypt_blocks(bytes(data))
+
+
+def _bitslice_encrypt(ctx, data):
+    if len(data) < BITSLICE_MIN_SIZE:
+        return _ttable_encrypt(ctx, data)
+    return aes_bitslice.encrypt_blocks(ctx, data)
+
+
+def _bitslice_decrypt(ctx, data):
+    if len(data) < BITSLICE_MIN_SIZE:
+        return _ttable_decrypt(ctx, data)
+    return aes_bitslice.decrypt_blocks(ctx, data)
+
+
+def _system_encrypt(ctx, data):
+    encryptor = Cipher(algorithms.AES(ctx.key), modes.ECB()).encryptor()
+    return encryptor.update(bytes(data)) + encryptor.finalize()
+
+
+def _system_decrypt(ctx, data):
+    decryptor = Cipher(algorithms.AES(ctx.key), modes.ECB()).decryptor()
+    return decryptor.update(bytes(data)) + decryptor.finalize()
+
+
+_registry = {}
+_default = None
+
+
+def register_backend(backend: AESBackend) -> None:
+    global _default
+    _registry[backend.name] = backend
+    _default = None
+
+
+def available_backends() -> list[str]:
+    """Tên các backend có thể dùng, nhanh nhất trước"""
+    return [b.name for b in sorted(_registry.values(), key=lambda b: -b.priority)]
+
+
+def _verified(backend: AESBackend) -> AESBackend:
+    if not backend.verified:
+        backend.self_test()
+    return backend
+
+
+def set_default_backend(name: str = None) -> None:
+    """
+    Ghim backend mặc định (None = tự chọn). Ghi cả vào biến môi trường để
+    các worker process (aes_parallel) dùng cùng backend.
+    """
+    global _default
+    if name is None:
+        os.environ.pop(ENV_VAR, None)
+        _default = None
+        return
+    backend = get_backend(name)
+    os.environ[ENV_VAR] = name
+    _default = backend
+
+
+def get_backend(name: str = None) -> AESBackend:
+    """Backend theo tên, hoặc mặc định (ghim qua CRYPTO_AES_BACKEND, không thì nhanh nhất)"""
+    global _default
+    if name is None:
+        if _default is not None:
+            return _default
+        name = os.environ.get(ENV_VAR) or None
+    if name is not None:
+        if name not in _registry:
+            raise ValueError(f"Unknown AES backend '{name}' (available: {', '.join(available_backends())})")
+        backend = _verified(_registry[name])
+        if os.environ.get(ENV_VAR) == name:
+            _default = backend
+        return backend
+    # Tự chọn: backend nhanh nhất vượt qua self-test
+    errors = []
+    for candidate in available_backends():
+        try:
+            _default = _verified(_registry[candidate])
+            return _default
+        except RuntimeError as e:
+            errors.append(str(e))
+    raise RuntimeError("No AES backend passed self-test: " + "; ".join(errors))
+
+
+register_backend(AESBackend("reference", 0, _reference_encrypt, _reference_decrypt))
+register_backend(AESBackend("ttable", 10, _ttable_encrypt, _ttable_decrypt,
+                            aes_context.encrypt_into, aes_context.decrypt_into))
+register_backend(AESBackend("bitslice", 20, _bitslice_encrypt, _bitslice_decrypt))
+if aes_numpy.HAS_NUMPY:
+    register_backend(AESBackend("numpy", 30, aes_numpy.encrypt_blocks, aes_numpy.decrypt_blocks,
+                                aes_numpy.encrypt_into, aes_numpy.decrypt_into))
+if Cipher is not None:
+    register_backend(AESBackend("cryptography", 40, _system_encrypt, _system_decrypt))
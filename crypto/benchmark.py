@@ -0,0 +1,224 @@
+"""
+Headless crypto benchmark (no Qt).
+Measures AES throughput of encrypt_file_data/decrypt_file_data per payload and
+key size, key_expansion ops/s, RSA keygen time per bit size and
+seal_aes_key/open_aes_key ops/s. Results are JSON so runs can be compared
+against a stored baseline:
+
+    python -m crypto.benchmark --output bench.json
+    python -m crypto.benchmark --baseline bench.json --threshold 0.1
+    python -m crypto.benchmark --backend ttable --quick
+
+AES numbers depend on the block engine (crypto.backends picks the fastest
+available one, e.g. OpenSSL when `cryptography` is installed); its name is
+recorded in meta.aes_backend.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import platform
+import argparse
+
+from crypto.aes_encrypt import encrypt_file_data, key_expansion
+from crypto.aes_decrypt import decrypt_file_data
+from crypto.aes_numpy import HAS_NUMPY
+from crypto.backends import available_backends, get_backend, set_default_backend
+from crypto.cryptoRSA_test.rsa_wrap_key import keygen, seal_aes_key, open_aes_key
+
+KB = 1024
+MB = 1024 * KB
+DEFAULT_SIZES = [1 * KB, 64 * KB, 1 * MB, 16 * MB, 256 * MB]
+QUICK_SIZES = [1 * KB, 64 * KB, 1 * MB]
+KEY_SIZES = [128, 192, 256]
+RSA_BITS = [512, 1024]
+# Thời gian đo tối thiểu cho mỗi case (lặp lại đến khi đủ, lấy lần nhanh nhất)
+MIN_TIME = 0.5
+DEFAULT_THRESHOLD = 0.10
+
+
+def _measure(func, min_time: float = MIN_TIME) -> float:
+    """Trả về thời gian nhanh nhất (giây) của một lần gọi func"""
+    best = float("inf")
+    total = 0.0
+    while total < min_time or best == float("inf"):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+    return best
+
+
+def _result(value: float, unit: str, higher_is_better: bool = True) -> dict:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def _size_label(size: int) -> str:
+    return f"{size // MB}MB" if size >= MB else f"{size // KB}KB"
+
+
+def bench_aes(sizes=DEFAULT_SIZES, key_sizes=KEY_SIZES, workers: int = 1, min_time: float = MIN_TIME) -> dict:
+    results = {}
+    for bits in key_sizes:
+        key_b64 = base64.b64encode(os.urandom(bits // 8)).decode()
+        for size in sizes:
+            data = os.urandom(size)
+            ciphertext = encrypt_file_data(data, key_b64, workers)
+            enc = _measure(lambda: encrypt_file_data(data, key_b64, workers), min_time)
+            dec = _measure(lambda: decrypt_file_data(ciphertext, key_b64, workers), min_time)
+            label = f"aes{bits}/{_size_label(size)}"
+            results[f"encrypt/{label}"] = _result(size / MB / enc, "MB/s")
+            results[f"decrypt/{label}"] = _result(size / MB / dec, "MB/s")
+    return results
+
+
+def bench_key_expansion(key_sizes=KEY_SIZES, min_time: float = MIN_TIME, batch: int = 100) -> dict:
+    results = {}
+    for bits in key_sizes:
+        key = os.urandom(bits // 8)
+
+        def run():
+            for _ in range(batch):
+                key_expansion(key)
+
+        results[f"key_expansion/aes{bits}"] = _result(batch / _measure(run, min_time), "ops/s")
+    return results
+
+
+def bench_keygen(rsa_bits=RSA_BITS, rounds: int = 3) -> dict:
+    """Keygen có thời gian ngẫu nhiên (tìm số nguyên tố) nên lấy trung bình nhiều lần"""
+    results = {}
+    for bits in rsa_bits:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            keygen(bits)
+        elapsed = (time.perf_counter() - start) / rounds
+        results[f"keygen/rsa{bits}"] = _result(elapsed, "s", higher_is_better=False)
+    return results
+
+
+def bench_key_wrap(rsa_bits=RSA_BITS, min_time: float = MIN_TIME, batch: int = 20) -> dict:
+    results = {}
+    aes_key = os.urandom(16)
+    for bits in rsa_bits:
+        n, e, d = keygen(bits)
+        public_key, private_key = f"{n},{e}", f"{n},{d}"
+        wrapped = seal_aes_key(aes_key, public_key)
+
+        def seal():
+            for _ in range(batch):
+                seal_aes_key(aes_key, public_key)
+
+        def unseal():
+            for _ in range(batch):
+                open_aes_key(wrapped, private_key)
+
+        results[f"seal_aes_key/rsa{bits}"] = _result(batch / _measure(seal, min_time), "ops/s")
+        results[f"open_aes_key/rsa{bits}"] = _result(batch / _measure(unseal, min_time), "ops/s")
+    return results
+
+
+def run_all(sizes=DEFAULT_SIZES, key_sizes=KEY_SIZES, rsa_bits=RSA_BITS,
+            workers: int = 1, min_time: float = MIN_TIME) -> dict:
+    results = {}
+    results.update(bench_aes(sizes, key_sizes, workers, min_time))
+    results.update(bench_key_expansion(key_sizes, min_time))
+    results.update(bench_keygen(rsa_bits))
+    results.update(bench_key_wrap(rsa_bits, min_time))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": HAS_NUMPY,
+            "aes_backend": get_backend().name,
+            "workers": workers,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    So sánh với baseline; trả về các case chậm đi quá threshold (0.1 = 10%).
+    Case chỉ có ở một bên thì bỏ qua.
+    """
+    regressions = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        if not cur["higher_is_better"]:
+            change = -change
+        if change < -threshold:
+            regressions.append({
+                "name": name,
+                "baseline": base["value"],
+                "current": cur["value"],
+                "unit": cur["unit"],
+                "change": change,
+            })
+    return regressions
+
+
+def _parse_sizes(text: str) -> list[int]:
+    sizes = []
+    for part in text.split(","):
+        part = part.strip().upper()
+        if part.endswith("MB"):
+            sizes.append(int(part[:-2]) * MB)
+        elif part.endswith("KB"):
+            sizes.append(int(part[:-2]) * KB)
+        else:
+            sizes.append(int(part))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crypto benchmark (AES, key expansion, RSA)")
+    parser.add_argument("--output", help="ghi kết quả JSON ra file (mặc định: stdout)")
+    parser.add_argument("--baseline", help="file JSON baseline để so sánh")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="ngưỡng regression (0.1 = chậm hơn 10%%)")
+    parser.add_argument("--sizes", type=_parse_sizes, help="vd: 1KB,1MB,16MB")
+    parser.add_argument("--key-sizes", type=lambda s: [int(x) for x in s.split(",")], default=KEY_SIZES)
+    parser.add_argument("--rsa-bits", type=lambda s: [int(x) for x in s.split(",")], default=RSA_BITS)
+    parser.add_argument("--backend", choices=available_backends(),
+                        help="AES backend cần đo (mặc định: backend nhanh nhất có sẵn)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--quick", action="store_true", help=f"chỉ đo payload nhỏ ({_size_label(QUICK_SIZES[-1])} trở xuống)")
+    args = parser.parse_args()
+
+    if args.backend:
+        set_default_backend(args.backend)
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    report = run_all(sizes, args.key_sizes, args.rsa_bits, args.workers, args.min_time)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        base_backend = baseline.get("meta", {}).get("aes_backend")
+        if base_backend != report["meta"]["aes_backend"]:
+            print(f"WARNING: AES backend khác baseline ({base_backend} -> {report['meta']['aes_backend']}), "
+                  f"số liệu AES không so sánh được (dùng --backend)", file=sys.stderr)
+        regressions = compare(report, baseline, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']}: {r['baseline']:.3f} -> {r['current']:.3f} {r['unit']} "
+                  f"({r['change']:+.1%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
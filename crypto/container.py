@@ -0,0 +1,276 @@
+"""
+Chunked, indexed .enc container format (v2).
+
+Layout:
+    header   MAGIC(4) | version u8 | mode u8 | reserved u16 | chunk_size u32 | plaintext_length u64
+    chunk i  nonce(12) | ciphertext | tag(16)          (AES-GCM, one per chunk)
+    footer   offset u64 * chunk_count | chunk_count u32 | FOOTER_MAGIC(4)
+
+Every chunk is encrypted independently with its own random nonce; its AAD is
+the header plus the chunk index, so chunks cannot be reordered, swapped
+between files or truncated unnoticed. Readers can decrypt chunks in parallel,
+seek to any byte range, verify a file chunk by chunk and resume a partially
+written file. Files without the header are legacy raw ECB ciphertext.
+"""
+import os
+import struct
+import hashlib
+from itertools import repeat
+
+from crypto.aes_gcm import GCMEncryptor, GCMDecryptor, IV_SIZE, TAG_SIZE
+from crypto.aes_parallel import get_pool, default_workers, PARALLEL_THRESHOLD
+from crypto.tracing import span
+
+MAGIC = b"SFA\x02"
+FOOTER_MAGIC = b"SFAI"
+VERSION = 2
+MODE_GCM = 1
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+HEADER = struct.Struct(">4sBBHIQ")
+FOOTER_TAIL = struct.Struct(">I4s")
+_INDEX = struct.Struct(">I")
+_OFFSET = struct.Struct(">Q")
+
+
+class ContainerHeader:
+    __slots__ = ('version', 'mode', 'chunk_size', 'plaintext_length', 'raw')
+
+    def __init__(self, chunk_size: int, plaintext_length: int, mode: int = MODE_GCM, version: int = VERSION):
+        self.version = version
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.plaintext_length = plaintext_length
+        self.raw = HEADER.pack(MAGIC, version, mode, 0, chunk_size, plaintext_length)
+
+    @classmethod
+    def parse(cls, raw: bytes) -> "ContainerHeader":
+        if len(raw) < HEADER.size:
+            raise ValueError("Container header truncated")
+        magic, version, mode, _, chunk_size, length = HEADER.unpack_from(raw)
+        if magic != MAGIC:
+            raise ValueError("Not a v2 container")
+        if version != VERSION or mode != MODE_GCM or chunk_size == 0:
+            raise ValueError(f"Unsupported container (version={version}, mode={mode})")
+        return cls(chunk_size, length, mode, version)
+
+    @property
+    def chunk_count(self) -> int:
+        # File rỗng vẫn có 1 chunk (rỗng) để có tag xác thực
+        return max(1, -(-self.plaintext_length // self.chunk_size))
+
+    def chunk_plain_length(self, index: int) -> int:
+        return min(self.chunk_size, self.plaintext_length - index * self.chunk_size)
+
+    def chunk_offset(self, index: int) -> int:
+        """Vị trí chunk trong file (tính được từ header, không cần footer)"""
+        return HEADER.size + index * (IV_SIZE + self.chunk_size + TAG_SIZE)
+
+    def footer_offset(self) -> int:
+        last = self.chunk_count - 1
+        return self.chunk_offset(last) + IV_SIZE + self.chunk_plain_length(last) + TAG_SIZE
+
+    def total_size(self) -> int:
+        return self.footer_offset() + self.chunk_count * _OFFSET.size + FOOTER_TAIL.size
+
+    def chunk_aad(self, index: int) -> bytes:
+        return self.raw + _INDEX.pack(index)
+
+
+def _encrypt_chunk(key: bytes, header_raw: bytes, index: int, data: bytes) -> bytes:
+    header = ContainerHeader.parse(header_raw)
+    nonce = os.urandom(IV_SIZE)
+    enc = GCMEncryptor(key, nonce, header.chunk_aad(index))
+    ct = enc.update(data)
+    return nonce + ct + enc.finalize()
+
+
+def _decrypt_chunk(key: bytes, header_raw: bytes, index: int, blob: bytes) -> bytes:
+    header = ContainerHeader.parse(header_raw)
+    if len(blob) != IV_SIZE + header.chunk_plain_length(index) + TAG_SIZE:
+        raise ValueError(f"Chunk {index} truncated")
+    dec = GCMDecryptor(key, blob[:IV_SIZE], header.chunk_aad(index))
+    pt = dec.update(blob[IV_SIZE:-TAG_SIZE])
+    try:
+        dec.verify(blob[-TAG_SIZE:])
+    except ValueError:
+        raise ValueError(f"Chunk {index} failed authentication") from None
+    return pt
+
+
+def _map(func, key, header, indexes, blobs, workers):
+    """Chạy func cho từng chunk, theo thứ tự (serial hoặc qua process pool)"""
+    # File nhỏ / một chunk: chi phí process pool lớn hơn lợi ích
+    if workers <= 1 or header.chunk_count == 1 or header.plaintext_length < PARALLEL_THRESHOLD:
+        return map(func, repeat(key), repeat(header.raw), indexes, blobs)
+    return get_pool(workers).map(func, repeat(key), repeat(header.raw), indexes, blobs)
+
+
+def _batches(count: int, size: int):
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+def read_header(f) -> ContainerHeader:
+    f.seek(0)
+    return ContainerHeader.parse(f.read(HEADER.size))
+
+
+def is_container(path: str) -> bool:
+    """True nếu file là container v2 hợp lệ (file cũ không có header -> False)"""
+    try:
+        with open(path, "rb") as f:
+            header = read_header(f)
+    except (OSError, ValueError):
+        return False
+    return os.path.getsize(path) >= header.chunk_offset(0)
+
+
+def _read_chunk_blob(f, header: ContainerHeader, index: int) -> bytes:
+    f.seek(header.chunk_offset(index))
+    return f.read(IV_SIZE + header.chunk_plain_length(index) + TAG_SIZE)
+
+
+def _write_chunks(src, dst, key, header, first, workers):
+    workers = workers or default_workers()
+    for batch in _batches(header.chunk_count - first, max(1, workers) * 4):
+        indexes = [first + i for i in batch]
+        data = [src.read(header.chunk_size) for _ in indexes]
+        for blob in _map(_encrypt_chunk, key, header, indexes, data, workers):
+            dst.write(blob)
+
+
+def _write_footer(dst, header: ContainerHeader) -> None:
+    count = header.chunk_count
+    dst.write(b"".join(_OFFSET.pack(header.chunk_offset(i)) for i in range(count)))
+    dst.write(FOOTER_TAIL.pack(count, FOOTER_MAGIC))
+
+
+def write_container(input_file: str, output_file: str, key: bytes,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1) -> None:
+    """Mã hóa input_file thành container v2"""
+    key = bytes(key)
+    header = ContainerHeader(chunk_size, os.path.getsize(input_file))
+    with span("container.write", header.plaintext_length), \
+            open(input_file, "rb") as src, open(output_file, "wb") as dst:
+        dst.write(header.raw)
+        _write_chunks(src, dst, key, header, 0, workers)
+        _write_footer(dst, header)
+
+
+def read_index(path: str) -> list[int]:
+    """Đọc footer index (danh sách offset của các chunk)"""
+    with open(path, "rb") as f:
+        header = read_header(f)
+        f.seek(header.footer_offset())
+        raw = f.read()
+    if len(raw) < FOOTER_TAIL.size:
+        raise ValueError("Container footer missing (file incomplete?)")
+    count, magic = FOOTER_TAIL.unpack_from(raw, len(raw) - FOOTER_TAIL.size)
+    if magic != FOOTER_MAGIC or count != header.chunk_count:
+        raise ValueError("Container footer corrupt")
+    return [_OFFSET.unpack_from(raw, i * _OFFSET.size)[0] for i in range(count)]
+
+
+def read_container(enc_path: str, out_path: str, key: bytes, workers: int = 1) -> None:
+    """Giải mã container v2 (các chunk có thể giải mã song song)"""
+    key = bytes(key)
+    workers = workers or default_workers()
+    with open(enc_path, "rb") as src:
+        header = read_header(src)
+        try:
+            with span("container.read", header.plaintext_length), open(out_path, "wb") as dst:
+                for batch in _batches(header.chunk_count, max(1, workers) * 4):
+                    blobs = [_read_chunk_blob(src, header, i) for i in batch]
+                    for pt in _map(_decrypt_chunk, key, header, batch, blobs, workers):
+                        dst.write(pt)
+        except Exception:
+            if os.path.exists(out_path):
+                os.remove(out_path)
+            raise
+
+
+def fingerprint(path: str) -> str:
+    """
+    SHA-256 (hex) của header và nonce + tag của mọi chunk: định danh file container
+    (nonce ngẫu nhiên, tag phụ thuộc nội dung) mà chỉ đọc ~28 bytes mỗi chunk
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        header = read_header(f)
+        digest.update(header.raw)
+        for i in range(header.chunk_count):
+            offset = header.chunk_offset(i)
+            f.seek(offset)
+            digest.update(f.read(IV_SIZE))
+            f.seek(offset + IV_SIZE + header.chunk_plain_length(i))
+            digest.update(f.read(TAG_SIZE))
+    return digest.hexdigest()
+
+
+def decrypt_chunk(path: str, index: int, key: bytes) -> bytes:
+    with open(path, "rb") as f:
+        header = read_header(f)
+        if not 0 <= index < header.chunk_count:
+            raise IndexError("Chunk index out of range")
+        return _decrypt_chunk(bytes(key), header.raw, index, _read_chunk_blob(f, header, index))
+
+
+def read_range(path: str, offset: int, length: int, key: bytes) -> bytes:
+    """Giải mã plaintext[offset:offset + length], chỉ đọc các chunk liên quan"""
+    key = bytes(key)
+    with open(path, "rb") as f:
+        header = read_header(f)
+        end = min(offset + length, header.plaintext_length)
+        if offset < 0 or length < 0:
+            raise ValueError("offset and length must be non-negative")
+        if offset >= end:
+            return b""
+        first, last = offset // header.chunk_size, (end - 1) // header.chunk_size
+        pt = b"".join(
+            _decrypt_chunk(key, header.raw, i, _read_chunk_blob(f, header, i))
+            for i in range(first, last + 1)
+        )
+    start = offset - first * header.chunk_size
+    return pt[start:start + end - offset]
+
+
+def verify_container(path: str, key: bytes) -> list[int]:
+    """Trả về danh sách index các chunk thiếu hoặc không xác thực được"""
+    key = bytes(key)
+    bad = []
+    with open(path, "rb") as f:
+        header = read_header(f)
+        for i in range(header.chunk_count):
+            try:
+                _decrypt_chunk(key, header.raw, i, _read_chunk_blob(f, header, i))
+            except ValueError:
+                bad.append(i)
+    return bad
+
+
+def resume_container(input_file: str, output_file: str, key: bytes, workers: int = 1) -> int:
+    """
+    Tiếp tục ghi container bị dừng giữa chừng: giữ các chunk đầu đã hợp lệ,
+    mã hóa lại từ chunk hỏng/thiếu đầu tiên. Trả về index chunk bắt đầu ghi lại.
+    """
+    key = bytes(key)
+    with open(output_file, "rb") as f:
+        header = read_header(f)
+    if header.plaintext_length != os.path.getsize(input_file):
+        raise ValueError("Input file does not match the partial container")
+    first = 0
+    with open(output_file, "rb") as f:
+        while first < header.chunk_count:
+            try:
+                _decrypt_chunk(key, header.raw, first, _read_chunk_blob(f, header, first))
+            except ValueError:
+                break
+            first += 1
+    with open(input_file, "rb") as src, open(output_file, "r+b") as dst:
+        dst.truncate(header.chunk_offset(first) if first < header.chunk_count else header.footer_offset())
+        dst.seek(0, os.SEEK_END)
+        src.seek(first * header.chunk_size)
+        _write_chunks(src, dst, key, header, first, workers)
+        _write_footer(dst, header)
+    return first
@@ -0,0 +1,210 @@
+"""
+Parsed RSA key objects and a compact key serialization.
+
+RSAPublicKey / RSAPrivateKey are immutable and precompute the modulus byte
+length; a private key optionally carries the CRT fields (p, q, dP, dQ, qInv).
+
+Compact format (binary, or base64 of it):
+    b"RK" | version u8 | kind u8 | (length u16 | big-endian integer) per field
+    kind 1: n, e    kind 2: n, d    kind 3: n, d, p, q, dP, dQ, qInv
+The binary form is about 2.4x smaller than the decimal "n,e" text (about
+1.7x as base64). The backend still parses decimal strings, so keys sent to
+it stay decimal (to_decimal()).
+
+load_public_key / load_private_key accept either format and are LRU-cached,
+so wrapping or unwrapping many keys with the same key string parses it once.
+"""
+import base64
+import struct
+from functools import lru_cache
+
+try:
+    from crypto.cryptoRSA_test.rsa_math import invert, powmod
+except ImportError:  # chạy trực tiếp như script trong thư mục này
+    from rsa_math import invert, powmod
+
+MAGIC = b"RK"
+VERSION = 1
+KIND_PUBLIC = 1
+KIND_PRIVATE = 2
+KIND_PRIVATE_CRT = 3
+KEY_CACHE_SIZE = 64
+
+_HEADER = struct.Struct(">2sBB")
+_LENGTH = struct.Struct(">H")
+
+
+def _int_bytes(x: int) -> bytes:
+    return x.to_bytes(max(1, (x.bit_length() + 7) // 8), "big")
+
+
+def _pack(kind: int, fields) -> bytes:
+    out = [_HEADER.pack(MAGIC, VERSION, kind)]
+    for x in fields:
+        raw = _int_bytes(x)
+        out.append(_LENGTH.pack(len(raw)))
+        out.append(raw)
+    return b"".join(out)
+
+
+def _unpack(data: bytes):
+    if len(data) < _HEADER.size:
+        raise ValueError("RSA key data truncated")
+    magic, version, kind = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a compact RSA key")
+    fields = []
+    pos = _HEADER.size
+    while pos < len(data):
+        if pos + _LENGTH.size > len(data):
+            raise ValueError("RSA key data truncated")
+        (length,) = _LENGTH.unpack_from(data, pos)
+        pos += _LENGTH.size
+        if pos + length > len(data):
+            raise ValueError("RSA key data truncated")
+        fields.append(int.from_bytes(data[pos:pos + length], "big"))
+        pos += length
+    return kind, fields
+
+
+class _FrozenKey:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _init(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.to_bytes()).decode()
+
+
+class RSAPublicKey(_FrozenKey):
+    __slots__ = ('n', 'e', 'byte_length')
+
+    def __init__(self, n: int, e: int):
+        self._init(n=n, e=e, byte_length=(n.bit_length() + 7) // 8)
+
+    def encrypt_int(self, m: int) -> int:
+        return powmod(m, self.e, self.n)
+
+    def to_bytes(self) -> bytes:
+        return _pack(KIND_PUBLIC, (self.n, self.e))
+
+    def to_decimal(self) -> str:
+        """Định dạng "n,e" (backend dùng định dạng này)"""
+        return f"{self.n},{self.e}"
+
+    def __eq__(self, other):
+        return isinstance(other, RSAPublicKey) and (self.n, self.e) == (other.n, other.e)
+
+    def __hash__(self):
+        return hash((self.n, self.e))
+
+    def __repr__(self):
+        return f"RSAPublicKey({self.n.bit_length()} bits, e={self.e})"
+
+
+class RSAPrivateKey(_FrozenKey):
+    __slots__ = ('n', 'd', 'p', 'q', 'dp', 'dq', 'qinv', 'byte_length')
+
+    def __init__(self, n: int, d: int, p: int = None, q: int = None,
+                 dp: int = None, dq: int = None, qinv: int = None):
+        if (p is None) != (q is None):
+            raise ValueError("CRT private key needs both p and q")
+        if p is not None:
+            if p * q != n:
+                raise ValueError("Invalid CRT private key: p * q != n")
+            dp = d % (p - 1) if dp is None else dp
+            dq = d % (q - 1) if dq is None else dq
+            qinv = invert(q, p) if qinv is None else qinv
+        self._init(n=n, d=d, p=p, q=q, dp=dp, dq=dq, qinv=qinv, byte_length=(n.bit_length() + 7) // 8)
+
+    @property
+    def has_crt(self) -> bool:
+        return self.p is not None
+
+    def decrypt_int(self, c: int) -> int:
+        """c^d mod n; dùng CRT (hai lũy thừa nửa kích thước + Garner) nếu có p, q"""
+        if self.p is None:
+            return powmod(c, self.d, self.n)
+        p, q = self.p, self.q
+        m1 = powmod(c % p, self.dp, p)
+        m2 = powmod(c % q, self.dq, q)
+        return m2 + ((self.qinv * (m1 - m2)) % p) * q
+
+    def to_bytes(self) -> bytes:
+        if self.p is None:
+            return _pack(KIND_PRIVATE, (self.n, self.d))
+        return _pack(KIND_PRIVATE_CRT, (self.n, self.d, self.p, self.q, self.dp, self.dq, self.qinv))
+
+    def to_decimal(self) -> str:
+        """Định dạng "n,d" hoặc "n,d,p,q,dP,dQ,qInv" (backend chỉ đọc n, d)"""
+        if self.p is None:
+            return f"{self.n},{self.d}"
+        return f"{self.n},{self.d},{self.p},{self.q},{self.dp},{self.dq},{self.qinv}"
+
+    def __eq__(self, other):
+        return isinstance(other, RSAPrivateKey) and (self.n, self.d) == (other.n, other.d)
+
+    def __hash__(self):
+        return hash((self.n, self.d))
+
+    def __repr__(self):
+        # Không in giá trị bí mật
+        return f"RSAPrivateKey({self.n.bit_length()} bits, crt={self.has_crt})"
+
+
+def _decode(key_str: str):
+    """Trả về (None, [ints]) với chuỗi decimal, hoặc (kind, [ints]) với base64 compact"""
+    key_str = key_str.strip()
+    if "," in key_str:
+        return None, [int(x) for x in key_str.split(",")]
+    try:
+        raw = base64.b64decode(key_str, validate=True)
+    except ValueError:
+        raise ValueError("RSA key must be decimal 'n,...' or compact base64") from None
+    return _unpack(raw)
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def load_public_key(key_str: str) -> RSAPublicKey:
+    """Parse "n,e" hoặc compact base64 (có cache)"""
+    kind, fields = _decode(key_str)
+    if kind not in (None, KIND_PUBLIC) or len(fields) != 2:
+        raise ValueError("Not an RSA public key")
+    return RSAPublicKey(*fields)
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def load_private_key(key_str: str) -> RSAPrivateKey:
+    """Parse "n,d", "n,d,p,q,dP,dQ,qInv" hoặc compact base64 (có cache)"""
+    kind, fields = _decode(key_str)
+    if kind == KIND_PUBLIC or len(fields) not in (2, 7):
+        raise ValueError("Private key must be 'n,d' or 'n,d,p,q,dP,dQ,qInv'")
+    return RSAPrivateKey(*fields)
+
+
+def public_key_from_bytes(data: bytes) -> RSAPublicKey:
+    kind, fields = _unpack(data)
+    if kind != KIND_PUBLIC or len(fields) != 2:
+        raise ValueError("Not an RSA public key")
+    return RSAPublicKey(*fields)
+
+
+def private_key_from_bytes(data: bytes) -> RSAPrivateKey:
+    kind, fields = _unpack(data)
+    if kind not in (KIND_PRIVATE, KIND_PRIVATE_CRT) or len(fields) not in (2, 7):
+        raise ValueError("Not an RSA private key")
+    return RSAPrivateKey(*fields)
+
+
+def clear_key_cache() -> None:
+    """Xóa cache key đã parse (gọi khi logout để không giữ private key trong bộ nhớ)"""
+    load_public_key.cache_clear()
+    load_private_key.cache_clear()
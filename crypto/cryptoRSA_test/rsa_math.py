@@ -0,0 +1,59 @@
+"""
+Big-integer arithmetic for RSA.
+Uses gmpy2 (GMP) when it is installed, pure Python otherwise; the choice is
+made once at import. Every function returns a plain int on both paths, so
+callers (keygen, seal/open, rsa_keys) never see gmpy2 types.
+    powmod(b, e, m)      b^e mod m
+    invert(a, m)         a^-1 mod m (ValueError if it does not exist)
+    egcd(a, b)           (g, x, y) with a*x + b*y = g, iterative
+    prime_prefilter(n)   cheap test run before the Miller–Rabin rounds
+"""
+import math
+
+try:
+    import gmpy2
+except ImportError:  # gmpy2 là tùy chọn
+    gmpy2 = None
+
+HAS_GMPY2 = gmpy2 is not None
+
+
+def egcd(a, b):
+    """Euclid mở rộng dạng vòng lặp (bản đệ quy cũ vượt giới hạn đệ quy với key lớn)"""
+    x0, y0, x1, y1 = 1, 0, 0, 1
+    while b:
+        q, a, b = a // b, b, a % b
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+    return a, x0, y0
+
+
+if HAS_GMPY2:
+    def powmod(b, e, m):
+        return int(gmpy2.powmod(b, e, m))
+
+    def invert(a, m):
+        try:
+            return int(gmpy2.invert(a, m))
+        except ZeroDivisionError:
+            raise ValueError("No modular inverse exists!") from None
+
+    def gcd(a, b):
+        return int(gmpy2.gcd(a, b))
+
+    def prime_prefilter(n):
+        # Chia thử + một vòng Miller–Rabin trong GMP
+        return bool(gmpy2.is_prime(n, 1))
+else:
+    powmod = pow
+    gcd = math.gcd
+
+    def invert(a, m):
+        g, x, _ = egcd(a, m)
+        if g != 1:
+            raise ValueError("No modular inverse exists!")
+        return x % m
+
+    def prime_prefilter(n):
+        # Fermat cơ sở 2
+        return pow(2, n - 1, n) == 1
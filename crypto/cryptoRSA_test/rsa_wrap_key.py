@@ -1,37 +1,52 @@
 import secrets, base64, os, sys
 
+try:
+    from crypto.cryptoRSA_test.rsa_keys import RSAPublicKey, RSAPrivateKey, load_public_key, load_private_key
+except ImportError:  # chạy trực tiếp như script trong thư mục này
+    from rsa_keys import RSAPublicKey, RSAPrivateKey, load_public_key, load_private_key
+try:
+    from crypto.cryptoRSA_test.rsa_math import gcd, egcd, invert, powmod, prime_prefilter
+except ImportError:
+    from rsa_math import gcd, egcd, invert, powmod, prime_prefilter
+
 # Force UTF-8 output (an toan hon neu muon giu ky tu dac biet)
 sys.stdout.reconfigure(encoding='utf-8')
 
 # ===== 1. BASIC FUNCTIONS =====
-
-def gcd(a, b):
-    while b != 0:
-        a, b = b, a % b
-    return a
-
-def egcd(a, b):
-    if b == 0:
-        return a, 1, 0
-    g, x1, y1 = egcd(b, a % b)
-    return g, y1, x1 - (a // b) * y1
+# gcd, egcd, powmod: rsa_math (gmpy2 nếu có cài, không thì Python thuần)
 
 def modinv(a, m):
-    g, x, _ = egcd(a, m)
-    if g != 1:
-        raise ValueError("No modular inverse exists!")
-    return x % m
+    return invert(a, m)
 
 # ===== 2. PRIME GENERATION =====
 
+def _primes_below(limit):
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(limit) if sieve[i]]
+
+# Các số nguyên tố nhỏ để sàng cửa sổ ứng viên (6542 số nguyên tố < 2^16).
+# Đã đo 2^14..2^18 với p 1024 bit: thời gian mỗi số nguyên tố gần như không đổi
+# (~130 ms trung vị), vì ~30 phép Fermat pow() 1024 bit (~4.5 ms/phép) chiếm phần lớn;
+# sàng rộng hơn bớt vài phép thử nhưng tốn thêm đúng chừng đó thời gian sàng.
+SIEVE_PRIMES = _primes_below(1 << 16)
+_SIEVE_PRIME_SET = frozenset(SIEVE_PRIMES)
+# Tích các số nguyên tố nhỏ: gcd(n, _PRIMORIAL) != 1 <=> n chia hết cho một trong số đó
+_PRIMORIAL_PRIMES = SIEVE_PRIMES[:200]
+_PRIMORIAL = 1
+for _p in _PRIMORIAL_PRIMES:
+    _PRIMORIAL *= _p
+del _p
+
 def is_probable_prime(n, k=16):
     if n < 2:
         return False
-    # quick small prime check
-    small_primes = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
-    for p in small_primes:
-        if n % p == 0:
-            return n == p
+    # quick small prime check: một phép gcd thay cho chia thử từng số
+    if gcd(n, _PRIMORIAL) != 1:
+        return n in _SIEVE_PRIME_SET
     # write n-1 = d * 2^r
     r, d = 0, n - 1
     while d % 2 == 0:
@@ -40,30 +55,100 @@ def is_probable_prime(n, k=16):
     # Miller–Rabin
     for _ in range(k):
         a = secrets.randbelow(n - 3) + 2  # a in [2, n-2]
-        x = pow(a, d, n)
+        x = powmod(a, d, n)
         if x == 1 or x == n - 1:
             continue
         for __ in range(r - 1):
-            x = pow(x, 2, n)
+            x = powmod(x, 2, n)
             if x == n - 1:
                 break
         else:
             return False
     return True
 
+def _sieve_window(start, size):
+    """
+    Sàng các ứng viên lẻ start, start + 2, ..., start + 2*(size-1) (start lẻ):
+    byte i = 1 nếu start + 2i không chia hết cho số nguyên tố nhỏ nào
+    """
+    window = bytearray([1]) * size
+    for p in SIEVE_PRIMES[1:]:
+        # start + 2i ≡ 0 (mod p)  <=>  i ≡ -start * 2^-1 (mod p)
+        i = (-(start % p) * ((p + 1) // 2)) % p
+        if i < size:
+            window[i::p] = bytes(len(range(i, size, p)))
+    return window
+
+def mr_rounds(bits):
+    """
+    Số vòng Miller–Rabin cho ứng viên ngẫu nhiên bits bit để xác suất sai < 2^-100
+    (FIPS 186-4, bảng C.3); số nhỏ dùng mặc định 16 vòng
+    """
+    if bits >= 1024:
+        return 5
+    if bits >= 512:
+        return 7
+    return 16
+
 def gen_prime(bits=256):
+    if bits < 32:
+        while True:
+            # ensure high bit and odd
+            x = (secrets.randbits(bits) | (3 << (bits - 2)) | 1)
+            if is_probable_prime(x):
+                return x
     while True:
-        # ensure high bit and odd
-        x = (secrets.randbits(bits) | (1 << (bits - 1)) | 1)
-        if is_probable_prime(x):
-            return x
+        p, _ = search_prime_window(bits)
+        if p is not None:
+            return p
+
+def search_prime_window(bits, max_tests=None, stop=None):
+    """
+    Sàng một cửa sổ ứng viên từ điểm bắt đầu ngẫu nhiên và thử các ứng viên còn lại
+    theo thứ tự tăng dần (tối đa max_tests ứng viên; stop() trả về True thì dừng).
+    Trả về (số nguyên tố hoặc None, số ứng viên đã thử).
+    """
+    size = max(1024, 4 * bits)
+    rounds = mr_rounds(bits)
+    # Hai bit cao = 1: tích hai số nguyên tố bits bit luôn có đúng 2*bits bit
+    start = secrets.randbits(bits) | (3 << (bits - 2)) | 1
+    window = _sieve_window(start, size)
+    tested = 0
+    i = window.find(1)
+    while i != -1 and (max_tests is None or tested < max_tests):
+        if stop is not None and stop():
+            break
+        x = start + 2 * i
+        if x.bit_length() != bits:
+            break
+        tested += 1
+        # Lọc rẻ (Fermat cơ sở 2, hoặc gmpy2.is_prime) trước khi chạy đủ các vòng Miller–Rabin
+        if prime_prefilter(x) and is_probable_prime(x, rounds):
+            return x, tested
+        i = window.find(1, i + 1)
+    return None, tested
 
 # ===== 3. RSA KEY GENERATION =====
 
-def keygen(bits=512):
-    p = gen_prime(bits // 2)
-    q = gen_prime(bits // 2)
+def keygen(bits=512, extended=False):
+    """
+    Trả về (n, e, d); extended=True trả về thêm p, q để tạo private key
+    dạng CRT: (n, e, d, p, q) -> format_private_key(n, d, p, q)
+    """
+    while True:
+        p = gen_prime(bits // 2)
+        q = gen_prime(bits // 2)
+        while q == p:
+            q = gen_prime(bits // 2)
+        key = _make_key(p, q, extended, bits)
+        if key is not None:
+            return key
+
+def _make_key(p, q, extended=False, bits=None):
+    """(n, e, d[, p, q]); None nếu n không đủ 2 * (bits // 2) bit (gọi lại với p, q khác)"""
     n = p * q
+    if bits is not None and n.bit_length() != 2 * (bits // 2):
+        return None
     phi = (p - 1) * (q - 1)
     e = 65537
     if gcd(e, phi) != 1:
@@ -71,18 +156,96 @@ def keygen(bits=512):
         while gcd(e, phi) != 1:
             e += 2
     d = modinv(e, phi)
+    if extended:
+        return n, e, d, p, q
     return n, e, d
 
+# Cờ dừng dùng chung giữa keygen_parallel và các worker process (gán trong initializer)
+_keygen_stop = None
+
+def _init_keygen_worker(stop_event):
+    global _keygen_stop
+    _keygen_stop = stop_event
+
+def _keygen_task(bits):
+    # Thử hết cửa sổ đã sàng (chi phí sàng chia cho mọi ứng viên), dừng sớm khi có cờ
+    return search_prime_window(bits, stop=_keygen_stop.is_set)
+
+def keygen_parallel(bits=2048, workers=None, progress=None, cancel=None, extended=False):
+    """
+    Như keygen nhưng tìm p, q song song trên nhiều process: mỗi task sàng một
+    cửa sổ ngẫu nhiên riêng, hai số nguyên tố đầu tiên tìm được được dùng.
+    Dùng process pool riêng (không dùng chung pool AES của aes_parallel).
+    progress(primes_found, candidates_tested) được gọi sau mỗi task;
+    cancel() trả về True để dừng -> hàm trả về None.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    workers = workers or os.cpu_count() or 1
+    half = bits // 2
+    # Không fork từ process GUI nhiều thread (như aes_parallel.mp_context)
+    ctx = multiprocessing.get_context(
+        "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+    stop = ctx.Event()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                               initializer=_init_keygen_worker, initargs=(stop,))
+    primes = []
+    tested = 0
+    pending = set()
+    key = None
+    try:
+        while key is None:
+            if cancel is not None and cancel():
+                return None
+            # Mỗi worker luôn có một cửa sổ đang thử
+            while len(pending) < workers:
+                pending.add(pool.submit(_keygen_task, half))
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                prime, count = future.result()
+                tested += count
+                if prime is not None and prime not in primes and len(primes) < 2:
+                    primes.append(prime)
+            if done and progress is not None:
+                progress(len(primes), tested)
+            if len(primes) == 2:
+                key = _make_key(primes[0], primes[1], extended, bits)
+                if key is None:
+                    primes.clear()
+    finally:
+        # Task đang chạy thấy cờ và dừng sau ứng viên hiện tại
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+    return key
+
+# ===== 3b. CRT PRIVATE KEY =====
+# Private key mở rộng: "n,d,p,q,dP,dQ,qInv" (dP = d mod (p-1), dQ = d mod (q-1),
+# qInv = q^-1 mod p). Hai trường đầu vẫn là "n,d" nên code chỉ đọc n, d
+# (kể cả backend) vẫn dùng được; key cũ "n,d" vẫn hợp lệ.
+# Parse và phép CRT nằm ở rsa_keys.RSAPrivateKey.
+
+def format_private_key(n, d, p=None, q=None):
+    return RSAPrivateKey(n, d, p, q).to_decimal()
+
 # ===== 4. RSA ENCRYPTION / DECRYPTION =====
 
 def rsa_encrypt(data: bytes, n, e):
     m = int.from_bytes(data, "big")
-    c = pow(m, e, n)
+    c = powmod(m, e, n)
     return c.to_bytes((c.bit_length() + 7) // 8, "big")
 
 def rsa_decrypt(cipher: bytes, n, d):
     c = int.from_bytes(cipher, "big")
-    m = pow(c, d, n)
+    m = powmod(c, d, n)
+    return m.to_bytes((m.bit_length() + 7) // 8, "big")
+
+def rsa_decrypt_key(cipher: bytes, private_key):
+    """
+    Như rsa_decrypt nhưng nhận RSAPrivateKey hoặc chuỗi private key (xem load_private_key);
+    key có p, q thì dùng CRT
+    """
+    key = private_key if isinstance(private_key, RSAPrivateKey) else load_private_key(private_key)
+    m = key.decrypt_int(int.from_bytes(cipher, "big"))
     return m.to_bytes((m.bit_length() + 7) // 8, "big")
 
 # ===== 5. WRAP AES KEY (DEMO) =====
@@ -98,26 +261,27 @@ def seal_key(aes_path, pub_file, out_file):
 
 def open_key(enc_path, prv_file, out_file):
     enc = base64.b64decode(open(enc_path, "rb").read())
-    n, d = map(int, open(prv_file).read().split(","))
-    dec = rsa_decrypt(enc, n, d)
+    dec = rsa_decrypt_key(enc, open(prv_file).read())
     dec = dec.rjust(16, b"\x00")  # ensure 16 bytes
     open(out_file, "wb").write(dec)
     print("Decrypted AES key saved to", out_file)
 
-def seal_aes_key(aes_key_bytes: bytes, public_key_str: str) -> bytes:
-    n, e = map(int, public_key_str.split(','))
+def seal_aes_key(aes_key_bytes: bytes, public_key_str) -> bytes:
+    """public_key_str: "n,e", compact base64 (xem rsa_keys) hoặc RSAPublicKey"""
+    key = public_key_str if isinstance(public_key_str, RSAPublicKey) else load_public_key(public_key_str)
     m = int.from_bytes(aes_key_bytes, 'big')
-    c = pow(m, e, n)
+    c = key.encrypt_int(m)
     return c.to_bytes((c.bit_length() + 7) // 8, 'big')
 
-def open_aes_key(encrypted_key_bytes: bytes, private_key_str: str) -> bytes:
+def open_aes_key(encrypted_key_bytes: bytes, private_key_str) -> bytes:
     """
     Unwrap AES key từ RSA encrypted bytes
+    private_key_str: "n,d", "n,d,p,q,dP,dQ,qInv", compact base64 hoặc RSAPrivateKey
     Returns: 16 bytes AES key
     """
-    n, d = map(int, private_key_str.split(','))
+    key = private_key_str if isinstance(private_key_str, RSAPrivateKey) else load_private_key(private_key_str)
     c = int.from_bytes(encrypted_key_bytes, 'big')
-    m = pow(c, d, n)
+    m = key.decrypt_int(c)
     
     # Tính số bytes cần thiết dựa trên bit_length của m
     num_bytes = (m.bit_length() + 7) // 8
@@ -146,9 +310,9 @@ def open_aes_key(encrypted_key_bytes: bytes, private_key_str: str) -> bytes:
 
 if __name__ == "__main__":
     print("Generating RSA keypair...", flush=True)
-    n, e, d = keygen(512)
+    n, e, d, p, q = keygen(512, extended=True)
     open("rsa_pub.txt", "w").write(f"{n},{e}")
-    open("rsa_prv.txt", "w").write(f"{n},{d}")
+    open("rsa_prv.txt", "w").write(format_private_key(n, d, p, q))
     print("RSA keys generated! (rsa_pub.txt / rsa_prv.txt)", flush=True)
 
     # Create AES key if not exists
@@ -0,0 +1,173 @@
+"""
+Lightweight per-stage timing.
+Spans record duration and bytes processed; nested spans become children of the
+enclosing one, so an operation can print a one-line per-stage summary. Events
+can be exported as Chrome trace-event JSON (chrome://tracing, Perfetto).
+
+Tracing is off by default: span() then returns a shared no-op object and
+traced() calls straight through, so instrumented code pays one flag check.
+Enable with enable() or the CRYPTO_TRACE environment variable (a value other
+than "1"/"true" is used as the trace file written at exit).
+"""
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+from collections import deque
+
+MAX_EVENTS = 100000
+
+_enabled = False
+_events = deque(maxlen=MAX_EVENTS)
+_local = threading.local()
+
+
+class Span:
+    __slots__ = ('name', 'nbytes', 'args', 'start', 'duration', 'tid', 'parent', 'children')
+
+    def __init__(self, name: str, nbytes: int = 0, **args):
+        self.name = name
+        self.nbytes = nbytes
+        self.args = args
+        self.start = 0
+        self.duration = 0
+        self.tid = 0
+        self.parent = None
+        self.children = []
+
+    def add_bytes(self, n: int) -> None:
+        self.nbytes += n
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        self.tid = threading.get_ident()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter_ns() - self.start
+        _local.stack.pop()
+        if self.parent is not None:
+            self.parent.children.append(self)
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        _events.append(self)
+        return False
+
+    def _describe(self) -> str:
+        text = f"{self.name} {self.duration / 1e9:.3f}s"
+        if self.nbytes and self.duration:
+            text += f" ({self.nbytes / (1024 * 1024) / (self.duration / 1e9):.1f} MB/s)"
+        return text
+
+    def summary(self) -> str:
+        """vd: 'encrypt 1.204s | get_user_keys 0.031s | CryptoUtils.encrypt_file 1.100s (9.1 MB/s)'"""
+        return " | ".join([self._describe()] + [child._describe() for child in self.children])
+
+
+class _NullSpan:
+    """Span dùng khi tracing tắt: không đo gì"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add_bytes(self, n: int) -> None:
+        pass
+
+    def summary(self) -> str:
+        return ""
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, nbytes: int = 0, **args):
+    """Context manager đo một stage (no-op khi tracing tắt)"""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, nbytes, **args)
+
+
+def traced(name: str = None):
+    """Decorator: đo cả hàm như một span (tên mặc định: __qualname__)"""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def clear() -> None:
+    _events.clear()
+
+
+def events() -> list:
+    return list(_events)
+
+
+def chrome_trace() -> dict:
+    """Các span đã ghi theo định dạng Chrome trace-event ('X' = complete event, đơn vị µs)"""
+    pid = os.getpid()
+    trace = []
+    for s in list(_events):
+        args = dict(s.args)
+        if s.nbytes:
+            args['bytes'] = s.nbytes
+        trace.append({
+            'name': s.name,
+            'cat': s.name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': s.start / 1000,
+            'dur': s.duration / 1000,
+            'pid': pid,
+            'tid': s.tid,
+            'args': args,
+        })
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+
+def export_chrome_trace(path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chrome_trace(), f)
+
+
+def _init_from_env():
+    value = os.environ.get('CRYPTO_TRACE', '').strip()
+    if not value or value.lower() in ('0', 'false'):
+        return
+    enable()
+    if value.lower() not in ('1', 'true'):
+        atexit.register(export_chrome_trace, value)
+
+
+_init_from_env()
@@ -1,8 +1,13 @@
-import requests
 import json
+import threading
+import time
 from PyQt5.QtCore import QThread, pyqtSignal
-from utils.config import API_BASE_URL, DEMO_MODE
+from utils.config import API_BASE_URL, DEMO_MODE, PUBLIC_KEY_CACHE_TTL
 from utils.helpers import CryptoUtils
+from services.transport import HTTPTransport
+from services.key_session import PrivateKeySession
+from services.file_catalog import FileCatalog
+from crypto.tracing import traced
 import os
 
 class APIService:
@@ -11,6 +16,14 @@ class APIService:
         self.token = None
         self.user_id = None
         self.demo_mode = DEMO_MODE
+        # Mọi request đi qua transport dùng chung (keep-alive, timeout, retry)
+        self.transport = HTTPTransport()
+        # Cache public key theo user_id: {user_id: {'publicKey', 'etag', 'expires'}}
+        self._public_key_cache = {}
+        self._public_key_lock = threading.Lock()
+        # Private key đã mở khóa (nhập password một lần cho nhiều lần giải mã)
+        self.key_session = PrivateKeySession()
+        self._file_catalog = None
     
     def set_token(self, token):
         """Thiết lập JWT token cho authentication"""
@@ -20,6 +33,13 @@ class APIService:
         """Thiết lập User ID cho các API yêu cầu header x-user-id"""
         self.user_id = user_id
     
+    @property
+    def file_catalog(self) -> FileCatalog:
+        """Catalog file cục bộ (SQLite, mở khi dùng lần đầu); đồng bộ: file_catalog.sync(self)"""
+        if self._file_catalog is None:
+            self._file_catalog = FileCatalog()
+        return self._file_catalog
+
     def get_headers(self):
         """Tạo headers cho API request"""
         headers = {'Content-Type': 'application/json'}
@@ -29,6 +49,7 @@ class APIService:
             headers['x-user-id'] = str(self.user_id)
         return headers
     
+    @traced()
     def register(self, email, password):
         """Đăng ký tài khoản mới"""
         if self.demo_mode:
@@ -46,7 +67,7 @@ class APIService:
                 'password': password,
                 'repeatPassword': password  # Backend yêu cầu repeatPassword
             }
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/auth/register',
                 json=data,
                 headers=self.get_headers()
@@ -55,6 +76,7 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
+    @traced()
     def login(self, email, password):
         """Đăng nhập"""
         if self.demo_mode:
@@ -77,7 +99,7 @@ class APIService:
                 'email': email,
                 'password': password
             }
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/auth/login',
                 json=data,
                 headers=self.get_headers()
@@ -91,6 +113,7 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
+    @traced()
     def encrypt_file(self, file_path):
         """Mã hóa file - theo API hiện tại: gửi metadata JSON (filename, filePath, aesKey)"""
         if self.demo_mode:
@@ -114,7 +137,7 @@ class APIService:
                 'filePath': file_path,
                 'aesKey': aes_key
             }
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/file/upload',
                 json=payload,
                 headers=self.get_headers()
@@ -123,6 +146,33 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
+    @traced()
+    def upload_file_metadata(self, filename, file_path, wrapped_aes_key):
+        """Gửi metadata file đã mã hóa lên /file/upload (aesKey là wrapped key)"""
+        if self.demo_mode:
+            import time
+            time.sleep(0.3)
+            return {
+                'error': 0,
+                'message': f'File {filename} đã được upload (DEMO MODE)'
+            }, 201
+
+        try:
+            payload = {
+                'filename': filename,
+                'filePath': file_path,
+                'aesKey': wrapped_aes_key
+            }
+            response = self.transport.post(
+                f'{self.base_url}/file/upload',
+                json=payload,
+                headers=self.get_headers()
+            )
+            return response.json(), response.status_code
+        except Exception as e:
+            return {'error': str(e)}, 500
+
+    @traced()
     def decrypt_file(self, file_path):
         """Giải mã file - Download và giải mã file"""
         if self.demo_mode:
@@ -142,8 +192,12 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
-    def get_user_files(self):
-        """Lấy danh sách file của user"""
+    @traced()
+    def get_user_files(self, since=None, limit=None):
+        """
+        Lấy danh sách file của user. since: cursor đồng bộ tăng dần ('' = từ đầu),
+        khi đó backend trả thêm 'cursor' và 'hasMore' (xem services/file_catalog.py)
+        """
         if self.demo_mode:
             # Mock response cho demo mode
             import time
@@ -152,16 +206,22 @@ class APIService:
                 'error': 0,
                 'message': 'Success (DEMO MODE)',
                 'data': [
-                    {'filename': 'document1.pdf', 'filePath': '/demo/encrypted/document1.pdf.enc'},
-                    {'filename': 'image.jpg', 'filePath': '/demo/encrypted/image.jpg.enc'},
-                    {'filename': 'data.txt', 'filePath': '/demo/encrypted/data.txt.enc'}
+                    {'id': 1, 'filename': 'document1.pdf', 'filePath': '/demo/encrypted/document1.pdf.enc'},
+                    {'id': 2, 'filename': 'image.jpg', 'filePath': '/demo/encrypted/image.jpg.enc'},
+                    {'id': 3, 'filename': 'data.txt', 'filePath': '/demo/encrypted/data.txt.enc'}
                 ]
             }, 200
         
         try:
-            response = requests.get(
+            params = {}
+            if since is not None:
+                params['since'] = since
+            if limit is not None:
+                params['limit'] = limit
+            response = self.transport.get(
                 f'{self.base_url}/file/list',
-                headers=self.get_headers()
+                headers=self.get_headers(),
+                params=params or None
             )
             result = response.json()
 
@@ -169,6 +229,9 @@ class APIService:
             if isinstance(result, dict):
                 if 'files' in result and 'data' not in result:
                     normalized = {'error': result.get('error', 0), 'data': result.get('files', [])}
+                    for field in ('cursor', 'hasMore'):
+                        if field in result:
+                            normalized[field] = result[field]
                     return normalized, response.status_code
                 # already in expected shape
                 return result, response.status_code
@@ -177,8 +240,12 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
+    @traced()
     def save_user_keys(self, public_key, private_key):
         """Lưu RSA keys của user"""
+        # Public key cũ trong cache không còn đúng (kể cả khi lưu lỗi giữa chừng)
+        self.invalidate_public_key(self.user_id)
+        self.key_session.lock()
         if self.demo_mode:
             # Mock response cho demo mode
             import time
@@ -193,7 +260,7 @@ class APIService:
                 'publicKey': public_key,
                 'privateKey': private_key
             }
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/user/save-key',
                 json=data,
                 headers=self.get_headers()
@@ -203,8 +270,46 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
-    def get_user_keys(self):
-        """Lấy RSA keys của user - CHỈ TRẢ PUBLIC KEY"""
+    def invalidate_public_key(self, user_id=None):
+        """Xóa public key đã cache của user_id (None = xóa hết)"""
+        with self._public_key_lock:
+            if user_id is None:
+                self._public_key_cache.clear()
+            else:
+                self._public_key_cache.pop(str(user_id), None)
+
+    @traced()
+    def get_user_keys(self, refresh=False):
+        """
+        Lấy RSA keys của user - CHỈ TRẢ PUBLIC KEY.
+        Public key được cache theo user_id trong PUBLIC_KEY_CACHE_TTL giây; hết hạn
+        (hoặc refresh=True) thì hỏi lại server với If-None-Match (ETag của Express),
+        key không đổi -> 304, không tải lại body.
+        """
+        cache_key = str(self.user_id) if self.user_id else None
+        with self._public_key_lock:
+            entry = self._public_key_cache.get(cache_key) if cache_key else None
+        if entry is not None and not refresh and time.monotonic() < entry['expires']:
+            return {'error': 0, 'data': {'publicKey': entry['publicKey']}}, 200
+
+        result, status, etag = self._fetch_user_keys(entry['etag'] if entry else None)
+        if status == 304 and entry is not None:
+            public_key = entry['publicKey']
+        elif status == 200 and isinstance(result, dict) and result.get('error') == 0:
+            public_key = result.get('data', {}).get('publicKey')
+        else:
+            return result, status
+        if cache_key and public_key:
+            with self._public_key_lock:
+                self._public_key_cache[cache_key] = {
+                    'publicKey': public_key,
+                    'etag': etag,
+                    'expires': time.monotonic() + PUBLIC_KEY_CACHE_TTL,
+                }
+        return {'error': 0, 'data': {'publicKey': public_key}}, 200
+
+    def _fetch_user_keys(self, etag=None):
+        """GET /user/get-key (có điều kiện nếu có etag) -> (result, status, etag mới)"""
         if self.demo_mode:
             # Mock response cho demo mode
             import time, base64, secrets
@@ -215,19 +320,25 @@ class APIService:
                 'data': {
                     'publicKey': base64.b64encode(secrets.token_bytes(256)).decode(),
                 }
-            }, 200
+            }, 200, None
         
         try:
-            response = requests.get(
+            headers = self.get_headers()
+            if etag:
+                headers['If-None-Match'] = etag
+            response = self.transport.get(
                 f'{self.base_url}/user/get-key',
-                headers=self.get_headers()
+                headers=headers
             )
+            if response.status_code == 304:
+                return None, 304, etag
             result = response.json()
             # backend returns { error:0, data: { publicKey } }
-            return result, response.status_code
+            return result, response.status_code, response.headers.get('ETag')
         except Exception as e:
-            return {'error': str(e)}, 500
+            return {'error': str(e)}, 500, None
 
+    @traced()
     def get_private_key(self, password):
         """Lấy private key - YÊU CẦU XÁC NHẬN PASSWORD"""
         if self.demo_mode:
@@ -242,7 +353,7 @@ class APIService:
             }, 200
         
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/user/get-private-key',
                 json={'password': password},
                 headers=self.get_headers()
@@ -252,8 +363,32 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
 
+    @traced()
+    def unlock_private_key(self, password):
+        """
+        Lấy private key (xác thực password) và mở phiên key_session.
+        Phiên đang mở thì không gọi server. Dùng key: self.key_session.get()
+        """
+        if self.key_session.is_unlocked:
+            return {'error': 0, 'message': 'Private key đã được mở khóa'}, 200
+        result, status = self.get_private_key(password)
+        if status != 200 or not isinstance(result, dict) or result.get('error') != 0:
+            return result, status
+        try:
+            self.key_session.unlock(result['data']['privateKey'])
+        except (KeyError, TypeError, ValueError) as e:
+            return {'error': 1, 'message': f'Private key không hợp lệ: {e}'}, 422
+        return {'error': 0, 'message': 'Private key đã được mở khóa'}, 200
+
+    def lock_private_key(self):
+        """Khóa phiên: xóa private key khỏi bộ nhớ"""
+        self.key_session.lock()
+
+    @traced()
     def logout(self):
         """Logout: gọi backend để invalidate token (blacklist)"""
+        self.invalidate_public_key()
+        self.key_session.lock()
         if self.demo_mode:
             # In demo mode just clear local token
             self.set_token(None)
@@ -261,7 +396,7 @@ class APIService:
             return {'error': 0, 'message': 'Logout (DEMO MODE)'}, 200
 
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/auth/logout',
                 headers=self.get_headers()
             )
@@ -273,6 +408,7 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
+    @traced()
     def share_file(self, file_id, recipient_email):
         """Share file với user khác"""
         if self.demo_mode:
@@ -284,7 +420,7 @@ class APIService:
             }, 200
         
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/file/share',
                 json={'fileId': file_id, 'recipientEmail': recipient_email},
                 headers=self.get_headers()
@@ -293,6 +429,7 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
+    @traced()
     def download_file_key(self, file_id, save_path):
         """
         Tải file .enc.key về máy (binary download)
@@ -315,7 +452,7 @@ class APIService:
             return None, 200
         
         try:
-            response = requests.get(
+            response = self.transport.get(
                 f'{self.base_url}/file/{file_id}/download-key',
                 headers=self.get_headers(),
                 stream=True  # Stream để tải file binary
@@ -338,6 +475,7 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
+    @traced()
     def download_file(self, file_id):
         """Tải nội dung file đã mã hóa từ server"""
         if self.demo_mode:
@@ -354,7 +492,7 @@ class APIService:
             }, 200
         
         try:
-            response = requests.get(
+            response = self.transport.get(
                 f'{self.base_url}/file/{file_id}/download',
                 headers=self.get_headers()
             )
@@ -362,6 +500,7 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
     
+    @traced()
     def encrypt_and_upload_file(self, file_path):
         """
         Mã hóa file và upload lên backend.
@@ -379,7 +518,7 @@ class APIService:
                 'filePath': encrypted_file_path,
                 'aesKey': aes_key
             }
-            response = requests.post(
+            response = self.transport.post(
                 f'{self.base_url}/file/upload',
                 json=payload,
                 headers=self.get_headers()
@@ -388,6 +527,7 @@ class APIService:
         except Exception as e:
             return {'error': str(e)}, 500
 
+    @traced()
     def download_and_decrypt_file(self, file_path, aes_key):
         """
         Tải file từ backend và giải mã.
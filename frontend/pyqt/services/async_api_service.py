@@ -0,0 +1,199 @@
+"""
+AsyncAPIService: các method của APIService dưới dạng coroutine (aiohttp).
+Dùng cho thao tác hàng loạt (tải key, share, upload metadata cho nhiều file):
+hàng trăm request chạy đồng thời trên một event loop thay vì mỗi request một
+QThread. Semaphore giới hạn số request đang bay; session (keep-alive), timeout,
+retry GET và nén gzip theo cùng cấu hình HTTP_* với HTTPTransport.
+Kết quả giống APIService: (dict hoặc None, status_code), lỗi -> ({'error': ...}, 500).
+Không phụ thuộc Qt; GUI gọi qua services/async_bridge.py.
+"""
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp là tùy chọn
+    aiohttp = None
+
+from utils.config import (API_BASE_URL, ASYNC_MAX_CONCURRENCY, HTTP_POOL_SIZE,
+                          HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_RETRIES, HTTP_BACKOFF,
+                          HTTP_GZIP_MIN_SIZE)
+from services.transport import encode_json, RETRY_STATUSES, IDEMPOTENT_METHODS
+
+HAS_AIOHTTP = aiohttp is not None
+
+
+class AsyncAPIService:
+    def __init__(self, base_url=API_BASE_URL, token=None, user_id=None,
+                 max_concurrency=ASYNC_MAX_CONCURRENCY, demo_service=None):
+        if not HAS_AIOHTTP:
+            raise RuntimeError("AsyncAPIService requires aiohttp (pip install aiohttp)")
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.user_id = user_id
+        self.max_concurrency = max_concurrency
+        self.retries = HTTP_RETRIES
+        self.backoff = HTTP_BACKOFF
+        # DEMO_MODE: chuyển sang APIService (mock) chạy trong thread pool
+        self.demo_service = demo_service
+        self._session = None
+        self._semaphore = None
+
+    @classmethod
+    def from_service(cls, api_service, **kwargs) -> "AsyncAPIService":
+        """Tạo từ APIService đang đăng nhập (cùng base_url, token, user_id)"""
+        return cls(api_service.base_url, api_service.token, api_service.user_id,
+                   demo_service=api_service if api_service.demo_mode else None, **kwargs)
+
+    def get_headers(self):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if self.user_id:
+            headers['x-user-id'] = str(self.user_id)
+        return headers
+
+    def _get_session(self):
+        # ClientSession và Semaphore phải được tạo trong event loop đang chạy
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=max(HTTP_POOL_SIZE, self.max_concurrency))
+            timeout = aiohttp.ClientTimeout(sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _request(self, method, path, json=None, save_path=None):
+        """
+        Gửi request, trả về (dict, status). save_path: lưu body (binary) vào file
+        khi status 200 và trả về (None, 200).
+        """
+        session = self._get_session()
+        headers = self.get_headers()
+        data = None
+        if json is not None:
+            data, headers = encode_json(json, headers, HTTP_GZIP_MIN_SIZE)
+        url = f'{self.base_url}{path}'
+        retry = method in IDEMPOTENT_METHODS
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                last = attempt == self.retries
+                try:
+                    async with session.request(method, url, data=data, headers=headers) as response:
+                        if retry and not last and response.status in RETRY_STATUSES:
+                            await asyncio.sleep(self.backoff * (2 ** attempt))
+                            continue
+                        if save_path is not None and response.status == 200:
+                            with open(save_path, 'wb') as f:
+                                async for chunk in response.content.iter_chunked(8192):
+                                    f.write(chunk)
+                            return None, 200
+                        try:
+                            return await response.json(content_type=None), response.status
+                        except ValueError:
+                            return {'error': f'HTTP {response.status}'}, response.status
+                except (aiohttp.ClientConnectorError, aiohttp.ServerDisconnectedError, asyncio.TimeoutError) as e:
+                    # Lỗi kết nối: retry với GET; POST chỉ retry khi chưa kết nối được
+                    if last or not (retry or isinstance(e, aiohttp.ClientConnectorError)):
+                        raise
+                    await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    async def _call(self, name, method, path, json=None, save_path=None, demo_args=()):
+        if self.demo_service is not None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, lambda: getattr(self.demo_service, name)(*demo_args))
+        try:
+            return await self._request(method, path, json=json, save_path=save_path)
+        except Exception as e:
+            return {'error': str(e) or type(e).__name__}, 500
+
+    async def register(self, email, password):
+        return await self._call('register', 'POST', '/auth/register',
+                                json={'email': email, 'password': password, 'repeatPassword': password},
+                                demo_args=(email, password))
+
+    async def login(self, email, password):
+        result, status = await self._call('login', 'POST', '/auth/login',
+                                          json={'email': email, 'password': password},
+                                          demo_args=(email, password))
+        if self.demo_service is not None:
+            self.token, self.user_id = self.demo_service.token, self.demo_service.user_id
+        elif status == 200 and isinstance(result, dict) and 'token' in result:
+            self.token = result['token']
+            self.user_id = result.get('userId', self.user_id)
+        return result, status
+
+    async def get_user_files(self):
+        result, status = await self._call('get_user_files', 'GET', '/file/list')
+        # Backend trả { error:0, files: [...] } -> chuẩn hóa như APIService
+        if isinstance(result, dict) and 'files' in result and 'data' not in result:
+            result = {'error': result.get('error', 0), 'data': result.get('files', [])}
+        return result, status
+
+    async def get_user_keys(self):
+        return await self._call('get_user_keys', 'GET', '/user/get-key')
+
+    async def get_private_key(self, password):
+        return await self._call('get_private_key', 'POST', '/user/get-private-key',
+                                json={'password': password}, demo_args=(password,))
+
+    async def save_user_keys(self, public_key, private_key):
+        return await self._call('save_user_keys', 'POST', '/user/save-key',
+                                json={'publicKey': public_key, 'privateKey': private_key},
+                                demo_args=(public_key, private_key))
+
+    async def upload_file_metadata(self, filename, file_path, wrapped_aes_key):
+        return await self._call('upload_file_metadata', 'POST', '/file/upload',
+                                json={'filename': filename, 'filePath': file_path, 'aesKey': wrapped_aes_key},
+                                demo_args=(filename, file_path, wrapped_aes_key))
+
+    async def share_file(self, file_id, recipient_email):
+        return await self._call('share_file', 'POST', '/file/share',
+                                json={'fileId': file_id, 'recipientEmail': recipient_email},
+                                demo_args=(file_id, recipient_email))
+
+    async def download_file_key(self, file_id, save_path):
+        """Tải file .enc.key về save_path; thành công -> (None, 200)"""
+        return await self._call('download_file_key', 'GET', f'/file/{file_id}/download-key',
+                                save_path=save_path, demo_args=(file_id, save_path))
+
+    async def download_file(self, file_id):
+        return await self._call('download_file', 'GET', f'/file/{file_id}/download',
+                                demo_args=(file_id,))
+
+    async def logout(self):
+        result, status = await self._call('logout', 'POST', '/auth/logout')
+        if status == 200:
+            self.token = None
+            self.user_id = None
+        return result, status
+
+
+async def gather(aws, progress=None) -> list:
+    """
+    Chạy các coroutine đồng thời (số request thực sự song song do semaphore của
+    AsyncAPIService giới hạn), trả về kết quả theo đúng thứ tự đầu vào.
+    progress(done, total) được gọi mỗi khi một thao tác xong.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    total = len(tasks)
+    try:
+        done = 0
+        for future in asyncio.as_completed(tasks):
+            await future
+            done += 1
+            if progress is not None:
+                progress(done, total)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return [task.result() for task in tasks]
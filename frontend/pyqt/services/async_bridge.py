@@ -0,0 +1,81 @@
+"""
+Cầu nối Qt <-> asyncio.
+Event loop asyncio chạy trên một thread nền duy nhất; GUI gửi coroutine bằng
+submit() và nhận kết quả qua callback, được gọi trên thread GUI (signal Qt
+queued). Một thread cho mọi request đồng thời thay vì một QThread mỗi request.
+
+    bridge = AsyncBridge()
+    api = AsyncAPIService.from_service(self.api_service)
+    bridge.submit(gather([api.share_file(fid, email) for fid in ids]), self.on_shared)
+"""
+import asyncio
+import itertools
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class AsyncBridge(QObject):
+    # (job id, kết quả, exception) - phát từ thread event loop, nhận trên thread GUI
+    _done = pyqtSignal(int, object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.loop = asyncio.new_event_loop()
+        self._callbacks = {}
+        self._ids = itertools.count(1)
+        self._done.connect(self._on_done)
+        self._thread = threading.Thread(target=self._run_loop, name="asyncio-bridge", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro, callback=None, error_callback=None) -> int:
+        """
+        Chạy coroutine trên event loop nền. callback(result) hoặc
+        error_callback(exception) được gọi trên thread GUI. Trả về job id.
+        """
+        job = next(self._ids)
+        self._callbacks[job] = (callback, error_callback)
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(lambda f: self._emit(job, f))
+        return job
+
+    def _emit(self, job, future):
+        if future.cancelled():
+            self._done.emit(job, None, asyncio.CancelledError())
+        elif future.exception() is not None:
+            self._done.emit(job, None, future.exception())
+        else:
+            self._done.emit(job, future.result(), None)
+
+    def _on_done(self, job, result, error):
+        callback, error_callback = self._callbacks.pop(job, (None, None))
+        if error is None:
+            if callback is not None:
+                callback(result)
+        elif error_callback is not None:
+            error_callback(error)
+
+    def run(self, coro, timeout=None):
+        """Chạy coroutine và chờ kết quả (chặn; dùng ngoài thread GUI hoặc trong script)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def close(self):
+        """Hủy các job còn chạy và dừng event loop"""
+        if not self.loop.is_running():
+            return
+
+        async def _shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(_shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+        self.loop.close()
+        self._callbacks.clear()
@@ -0,0 +1,216 @@
+"""
+Catalog file cục bộ (SQLite) thay cho việc tải lại toàn bộ /file/list.
+Mỗi user một tập bản ghi, có index theo id, filename và content_hash (fingerprint
+của file .enc, xem crypto.container.fingerprint; ghi lại khi mã hóa trên máy này).
+Tra cứu filename -> id, hash -> id làm cục bộ. Bảng local_files nhớ file .enc đã lưu trên máy (đường dẫn, size, mtime)
+-> id, để tìm lại file mà không phải hash lại nội dung.
+Đồng bộ tăng dần: GET /file/list?since=<cursor>&limit=N trả về các file thay đổi
+sau cursor (theo updatedAt, id) kèm cursor mới và hasMore. Backend chưa hỗ trợ
+(không trả cursor) thì danh sách đầy đủ được dùng để thay toàn bộ catalog.
+Backend không xóa file nên không cần đồng bộ bản ghi bị xóa.
+"""
+import os
+import sqlite3
+import threading
+
+from utils.config import FILE_CATALOG_PATH, FILE_SYNC_PAGE_SIZE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    user_id      TEXT    NOT NULL,
+    id           INTEGER NOT NULL,
+    filename     TEXT    NOT NULL,
+    file_path    TEXT,
+    content_hash TEXT,
+    updated_at   TEXT,
+    PRIMARY KEY (user_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_files_filename ON files (user_id, filename);
+CREATE INDEX IF NOT EXISTS idx_files_hash ON files (user_id, content_hash);
+CREATE TABLE IF NOT EXISTS local_files (
+    user_id    TEXT    NOT NULL,
+    local_path TEXT    NOT NULL,
+    id         INTEGER NOT NULL,
+    size       INTEGER NOT NULL,
+    mtime_ns   INTEGER NOT NULL,
+    PRIMARY KEY (user_id, local_path)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    user_id TEXT PRIMARY KEY,
+    cursor  TEXT
+);
+"""
+
+_COLUMNS = "id, filename, file_path, content_hash, updated_at"
+
+# content_hash chỉ có ở máy đã mã hóa file: không ghi đè bằng NULL khi đồng bộ từ server
+_UPSERT = """
+INSERT INTO files (user_id, id, filename, file_path, content_hash, updated_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, id) DO UPDATE SET
+    filename = excluded.filename,
+    file_path = excluded.file_path,
+    content_hash = COALESCE(excluded.content_hash, files.content_hash),
+    updated_at = excluded.updated_at
+"""
+
+
+def _row_to_file(row) -> dict:
+    """Bản ghi -> dict cùng tên trường với /file/list"""
+    file_id, filename, file_path, content_hash, updated_at = row
+    return {'id': file_id, 'filename': filename, 'filePath': file_path,
+            'contentHash': content_hash, 'updatedAt': updated_at}
+
+
+class FileCatalog:
+    def __init__(self, path=FILE_CATALOG_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        # Dùng chung giữa GUI và worker thread, mọi truy cập qua self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ===== Ghi =====
+
+    def upsert(self, user_id, files, content_hash=None) -> int:
+        """Thêm/cập nhật các file (dict như /file/list); content_hash chỉ dùng khi có 1 file"""
+        rows = [
+            (str(user_id), int(f['id']), f.get('filename', ''), f.get('filePath'),
+             content_hash if content_hash is not None else f.get('contentHash'), f.get('updatedAt'))
+            for f in files if f.get('id') is not None
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def replace_all(self, user_id, files) -> int:
+        """Thay toàn bộ catalog của user bằng danh sách đầy đủ (giữ content_hash đã biết)"""
+        user_id = str(user_id)
+        ids = [int(f['id']) for f in files if f.get('id') is not None]
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_ids (id INTEGER PRIMARY KEY)")
+            self._conn.execute("DELETE FROM keep_ids")
+            self._conn.executemany("INSERT OR IGNORE INTO keep_ids (id) VALUES (?)", ((i,) for i in ids))
+            self._conn.execute("DELETE FROM files WHERE user_id = ? AND id NOT IN (SELECT id FROM keep_ids)",
+                               (user_id,))
+        return self.upsert(user_id, files)
+
+    def set_hash(self, user_id, file_id, content_hash) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE files SET content_hash = ? WHERE user_id = ? AND id = ?",
+                               (content_hash, str(user_id), int(file_id)))
+
+    def set_local_path(self, user_id, file_id, local_path) -> None:
+        """Ghi nhớ file .enc trên máy ứng với file_id (size, mtime để biết file đã bị thay)"""
+        local_path = os.path.abspath(local_path)
+        st = os.stat(local_path)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO local_files (user_id, local_path, id, size, mtime_ns) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               (str(user_id), local_path, int(file_id), st.st_size, st.st_mtime_ns))
+
+    def clear(self, user_id=None) -> None:
+        """Xóa catalog của user (None = mọi user); lần sync sau tải lại từ đầu"""
+        with self._lock, self._conn:
+            if user_id is None:
+                self._conn.execute("DELETE FROM files")
+                self._conn.execute("DELETE FROM local_files")
+                self._conn.execute("DELETE FROM sync_state")
+            else:
+                self._conn.execute("DELETE FROM files WHERE user_id = ?", (str(user_id),))
+                self._conn.execute("DELETE FROM local_files WHERE user_id = ?", (str(user_id),))
+                self._conn.execute("DELETE FROM sync_state WHERE user_id = ?", (str(user_id),))
+
+    # ===== Đọc =====
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get(self, user_id, file_id):
+        rows = self._query(f"SELECT {_COLUMNS} FROM files WHERE user_id = ? AND id = ?",
+                           (str(user_id), int(file_id)))
+        return _row_to_file(rows[0]) if rows else None
+
+    def find_by_filename(self, user_id, filename) -> list:
+        """Các file trùng tên, mới nhất trước"""
+        rows = self._query(f"SELECT {_COLUMNS} FROM files WHERE user_id = ? AND filename = ? "
+                           "ORDER BY updated_at DESC, id DESC", (str(user_id), filename))
+        return [_row_to_file(r) for r in rows]
+
+    def find_by_hash(self, user_id, content_hash) -> list:
+        if not content_hash:
+            return []
+        rows = self._query(f"SELECT {_COLUMNS} FROM files WHERE user_id = ? AND content_hash = ? "
+                           "ORDER BY updated_at DESC, id DESC", (str(user_id), content_hash))
+        return [_row_to_file(r) for r in rows]
+
+    def find_by_local_path(self, user_id, local_path):
+        """File đã ghi nhớ cho đường dẫn này, None nếu chưa có hoặc file đã thay đổi"""
+        local_path = os.path.abspath(local_path)
+        rows = self._query("SELECT id, size, mtime_ns FROM local_files WHERE user_id = ? AND local_path = ?",
+                           (str(user_id), local_path))
+        if not rows:
+            return None
+        file_id, size, mtime_ns = rows[0]
+        try:
+            st = os.stat(local_path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+            return None
+        return self.get(user_id, file_id)
+
+    def list_files(self, user_id, limit=-1, offset=0) -> list:
+        rows = self._query(f"SELECT {_COLUMNS} FROM files WHERE user_id = ? ORDER BY id LIMIT ? OFFSET ?",
+                           (str(user_id), limit, offset))
+        return [_row_to_file(r) for r in rows]
+
+    def count(self, user_id) -> int:
+        return self._query("SELECT COUNT(*) FROM files WHERE user_id = ?", (str(user_id),))[0][0]
+
+    def get_cursor(self, user_id):
+        rows = self._query("SELECT cursor FROM sync_state WHERE user_id = ?", (str(user_id),))
+        return rows[0][0] if rows else None
+
+    def set_cursor(self, user_id, cursor) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO sync_state (user_id, cursor) VALUES (?, ?) "
+                               "ON CONFLICT (user_id) DO UPDATE SET cursor = excluded.cursor",
+                               (str(user_id), cursor))
+
+    # ===== Đồng bộ =====
+
+    def sync(self, api_service, page_size=FILE_SYNC_PAGE_SIZE):
+        """
+        Đồng bộ catalog của api_service.user_id với server.
+        Trả về ({'error': 0, 'synced': số file nhận được, 'full': bool}, 200) hoặc lỗi của API.
+        """
+        user_id = api_service.user_id
+        cursor = self.get_cursor(user_id)
+        synced = 0
+        while True:
+            result, status = api_service.get_user_files(since=cursor or '', limit=page_size)
+            if status != 200 or not isinstance(result, dict) or result.get('error') != 0:
+                return result, status
+            files = result.get('data', [])
+            next_cursor = result.get('cursor')
+            if next_cursor is None:
+                # Server không hỗ trợ cursor: đây là danh sách đầy đủ
+                self.replace_all(user_id, files)
+                self.set_cursor(user_id, None)
+                return {'error': 0, 'synced': len(files), 'full': True}, 200
+            synced += self.upsert(user_id, files)
+            self.set_cursor(user_id, next_cursor)
+            if not result.get('hasMore') or not files:
+                return {'error': 0, 'synced': synced, 'full': False}, 200
+            cursor = next_cursor
@@ -0,0 +1,88 @@
+"""
+Phiên private key: nhập password một lần, giữ private key đã parse trong bộ nhớ.
+Giải mã hàng loạt dùng lại key thay vì mỗi file một lần hỏi password + một
+request get-private-key (bcrypt trên server). Key bị xóa khi lock(), khi logout
+hoặc khi không dùng quá idle_timeout giây.
+Python không ghi đè được vùng nhớ của int: "xóa" là bỏ mọi tham chiếu tới key
+(kể cả cache parse của rsa_keys và cache AESContext) để GC thu hồi.
+"""
+import threading
+import time
+
+from crypto.aes_context import clear_contexts
+from crypto.cryptoRSA_test.rsa_keys import load_private_key, clear_key_cache
+from utils.config import PRIVATE_KEY_IDLE_TIMEOUT
+
+
+class PrivateKeySession:
+    def __init__(self, idle_timeout=PRIVATE_KEY_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._key = None
+        self._last_used = 0.0
+        self._timer = None
+        self._lock = threading.Lock()
+        # Gọi (không tham số) sau khi phiên bị khóa do hết thời gian chờ
+        self.on_timeout = None
+
+    def unlock(self, private_key_str):
+        """Parse private key ("n,d", CRT hoặc compact) và mở phiên; ValueError nếu key hỏng"""
+        key = load_private_key(private_key_str)
+        # Không để bản parse nằm lại trong lru_cache sau khi phiên khóa
+        clear_key_cache()
+        with self._lock:
+            self._key = key
+            self._last_used = time.monotonic()
+            self._schedule(self.idle_timeout)
+        return key
+
+    @property
+    def is_unlocked(self) -> bool:
+        with self._lock:
+            return self._key is not None and not self._expired()
+
+    def get(self):
+        """RSAPrivateKey của phiên (và gia hạn thời gian chờ), hoặc None nếu đã khóa"""
+        with self._lock:
+            if self._key is None:
+                return None
+            if self._expired():
+                self._wipe()
+                return None
+            self._last_used = time.monotonic()
+            return self._key
+
+    def lock(self) -> None:
+        with self._lock:
+            self._wipe()
+
+    def _expired(self) -> bool:
+        return time.monotonic() - self._last_used >= self.idle_timeout
+
+    def _wipe(self):
+        self._key = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        clear_key_cache()
+        # Key AES của các file đã giải mã trong phiên
+        clear_contexts()
+
+    def _schedule(self, delay):
+        # Một timer cho mỗi khoảng chờ: khi chạy, nếu key vừa được dùng thì hẹn lại phần còn lại
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            if self._key is None:
+                return
+            remaining = self.idle_timeout - (time.monotonic() - self._last_used)
+            if remaining > 0:
+                self._schedule(remaining)
+                return
+            self._wipe()
+        if self.on_timeout is not None:
+            self.on_timeout()
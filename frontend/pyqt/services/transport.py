@@ -0,0 +1,90 @@
+"""
+HTTP transport cho APIService.
+Một requests.Session dùng chung cho mọi thread (APIWorker): connection pool
+keep-alive của urllib3 là thread-safe, header được truyền theo từng request
+nên không có state dùng chung nào bị sửa. Mỗi request có timeout connect/read;
+request idempotent (GET, PUT, DELETE, ...) được retry với backoff lũy thừa khi
+lỗi kết nối hoặc 502/503/504. Body JSON lớn được nén gzip (express.json tự giải nén).
+"""
+import gzip
+import json
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.config import (HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+                          HTTP_RETRIES, HTTP_BACKOFF, HTTP_GZIP_MIN_SIZE)
+
+RETRY_STATUSES = (502, 503, 504)
+# GET, HEAD, PUT, DELETE, OPTIONS, TRACE
+IDEMPOTENT_METHODS = Retry.DEFAULT_ALLOWED_METHODS
+
+
+def encode_json(payload, headers=None, gzip_min_size=HTTP_GZIP_MIN_SIZE):
+    """Body JSON (bytes) + headers; nén gzip nếu body >= gzip_min_size (None = không nén)"""
+    body = json.dumps(payload).encode('utf-8')
+    headers = dict(headers or {})
+    headers['Content-Type'] = 'application/json'
+    if gzip_min_size is not None and len(body) >= gzip_min_size:
+        body = gzip.compress(body, compresslevel=5)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
+
+
+class HTTPTransport:
+    def __init__(self, pool_size=HTTP_POOL_SIZE, connect_timeout=HTTP_CONNECT_TIMEOUT,
+                 read_timeout=HTTP_READ_TIMEOUT, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF,
+                 gzip_min_size=HTTP_GZIP_MIN_SIZE):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.gzip_min_size = gzip_min_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """Session tạo lười (lần request đầu), dùng chung giữa các thread"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        # allowed_methods mặc định của Retry chỉ gồm các method idempotent (không có POST);
+        # lỗi connect (request chưa tới server) được retry với mọi method
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                              max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def request(self, method, url, headers=None, json=None, timeout=None, **kwargs) -> requests.Response:
+        if json is not None:
+            kwargs['data'], headers = encode_json(json, headers, self.gzip_min_size)
+        return self.session.request(method, url, headers=headers,
+                                    timeout=timeout or self.timeout, **kwargs)
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
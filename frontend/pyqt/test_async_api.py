@@ -0,0 +1,172 @@
+# Test AsyncAPIService / AsyncBridge với stub HTTP server cục bộ
+# Không cần backend thật: python test_async_api.py (cần aiohttp)
+
+import base64
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from services.async_api_service import AsyncAPIService, HAS_AIOHTTP, gather
+from services.async_bridge import AsyncBridge
+from utils.config import HTTP_GZIP_MIN_SIZE
+
+SHARE_DELAY = 0.05
+KEY_BYTES = b"\x01" * 64
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.get_key_calls = 0
+        self.gzip_bodies = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        raw = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            self.state.gzip_bodies += 1
+            raw = gzip.decompress(raw)
+        return json.loads(raw) if raw else {}
+
+    def _send(self, status, payload=None, raw=None):
+        body = raw if raw is not None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream' if raw is not None else 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self._body()
+        if self.path == '/auth/login':
+            return self._send(200, {'error': 0, 'token': 'stub-token', 'userId': 1})
+        if self.path == '/file/share':
+            if self.headers.get('Authorization') != 'Bearer stub-token':
+                return self._send(401, {'error': 1, 'message': 'Unauthorized'})
+            with self.state.lock:
+                self.state.in_flight += 1
+                self.state.max_in_flight = max(self.state.max_in_flight, self.state.in_flight)
+            time.sleep(SHARE_DELAY)
+            with self.state.lock:
+                self.state.in_flight -= 1
+            if body['recipientEmail'].startswith('missing'):
+                return self._send(404, {'error': 1, 'message': 'Recipient not found'})
+            return self._send(200, {'error': 0, 'sharedFile': {
+                'fileId': body['fileId'], 'aesKey': base64.b64encode(KEY_BYTES).decode()}})
+        if self.path == '/file/upload':
+            return self._send(201, {'error': 0, 'file': {'id': 1, 'filename': body['filename']}})
+        self._send(404, {'error': 1, 'message': 'Not found'})
+
+    def do_GET(self):
+        if self.path == '/user/get-key':
+            # Lần đầu trả 503 để kiểm tra retry GET
+            self.state.get_key_calls += 1
+            if self.state.get_key_calls == 1:
+                return self._send(503, {'error': 1, 'message': 'Unavailable'})
+            return self._send(200, {'error': 0, 'data': {'publicKey': '3233,17'}})
+        if self.path.endswith('/download-key'):
+            return self._send(200, raw=KEY_BYTES)
+        self._send(404, {'error': 1, 'message': 'Not found'})
+
+
+def start_stub_server():
+    state = StubState()
+    handler = type('Handler', (StubHandler,), {'state': state})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def check(name, ok, detail=""):
+    print(f"{'✅' if ok else '❌'} {name}{': ' + str(detail) if detail else ''}")
+    return ok
+
+
+def test_async_api(bridge, base_url, state):
+    """Login, share hàng loạt (giới hạn đồng thời), retry GET, upload gzip, tải file key"""
+    api = AsyncAPIService(base_url, max_concurrency=4)
+    ok = True
+    result, status = bridge.run(api.login('a@example.com', '123456'))
+    ok &= check("login", status == 200 and api.token == 'stub-token', status)
+
+    emails = [f"user{i}@example.com" for i in range(20)] + ["missing@example.com"]
+    start = time.perf_counter()
+    results = bridge.run(gather([api.share_file(7, email) for email in emails]))
+    elapsed = time.perf_counter() - start
+    statuses = [status for _, status in results]
+    ok &= check("share 21 người nhận", statuses == [200] * 20 + [404], statuses)
+    ok &= check("giới hạn đồng thời", 1 < state.max_in_flight <= 4, f"tối đa {state.max_in_flight} request")
+    # Tuần tự cần 21 * SHARE_DELAY; 4 request song song cần khoảng 6 * SHARE_DELAY
+    ok &= check("chạy đồng thời", elapsed < 21 * SHARE_DELAY * 0.6, f"{elapsed:.2f}s")
+
+    result, status = bridge.run(api.get_user_keys())
+    ok &= check("retry GET khi 503", status == 200 and state.get_key_calls == 2, f"{state.get_key_calls} lần gọi")
+
+    result, status = bridge.run(api.upload_file_metadata('a.txt', 'a.txt.enc', 'k' * HTTP_GZIP_MIN_SIZE))
+    ok &= check("upload metadata (gzip)", status == 201 and state.gzip_bodies == 1, status)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        key_path = os.path.join(tmp, 'a.enc.key')
+        result, status = bridge.run(api.download_file_key(7, key_path))
+        ok &= check("tải file key", status == 200 and open(key_path, 'rb').read() == KEY_BYTES, status)
+    bridge.run(api.close())
+    return ok
+
+
+def test_bridge_callback(bridge, base_url):
+    """submit(): callback được gọi trên thread GUI"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    api = AsyncAPIService(base_url, token='stub-token')
+    received = []
+
+    def on_done(results):
+        received.append((threading.current_thread() is threading.main_thread(), results))
+        app.quit()
+
+    async def share_two():
+        async with api:
+            return await gather([api.share_file(1, 'x@example.com'), api.share_file(1, 'y@example.com')])
+
+    bridge.submit(share_two(), on_done, lambda e: app.quit())
+    QTimer.singleShot(5000, app.quit)
+    app.exec_()
+    ok = bool(received) and received[0][0] and [s for _, s in received[0][1]] == [200, 200]
+    return check("callback trên thread GUI", ok, received[0][1] if received else "timeout")
+
+
+if __name__ == "__main__":
+    print("🚀 Testing AsyncAPIService với stub server...")
+    print("=" * 50)
+    if not HAS_AIOHTTP:
+        print("❌ Cần cài aiohttp: pip install aiohttp")
+        exit(1)
+
+    app = QCoreApplication(sys.argv)
+    server, state = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    bridge = AsyncBridge()
+    try:
+        passed = test_async_api(bridge, base_url, state)
+        passed &= test_bridge_callback(bridge, base_url)
+    finally:
+        bridge.close()
+        server.shutdown()
+
+    print("\n🎉 Tất cả test đều pass!" if passed else "\n❌ Có test thất bại!")
+    exit(0 if passed else 1)
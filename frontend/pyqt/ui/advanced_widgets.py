@@ -1,15 +1,42 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QLabel, QListWidget, QGroupBox,
-                             QTextEdit, QMessageBox, QLineEdit, QInputDialog)
+                             QTextEdit, QMessageBox, QLineEdit, QInputDialog,
+                             QComboBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import os
-from utils.config import BUTTON_STYLE
+from utils.config import BUTTON_STYLE, DANGER_BUTTON_STYLE, RSA_KEY_SIZES, RSA_DEFAULT_KEY_BITS
 from utils.helpers import show_message
+from crypto.cryptoRSA_test.rsa_wrap_key import keygen_parallel, format_private_key
+
+
+class KeygenWorker(QThread):
+    """Tạo RSA keypair trong background (các process tìm p, q song song)"""
+    progress = pyqtSignal(int, int)
+    # Không đặt tên finished: trùng (che) signal QThread.finished
+    key_ready = pyqtSignal(object)
+
+    def __init__(self, bits):
+        super().__init__()
+        self.bits = bits
+
+    def run(self):
+        try:
+            key = keygen_parallel(
+                self.bits,
+                progress=self.progress.emit,
+                cancel=self.isInterruptionRequested,
+                extended=True
+            )
+            self.key_ready.emit(key)
+        except Exception as e:
+            self.key_ready.emit(e)
+
 
 class KeyManagementWidget(QWidget):
     def __init__(self, api_service):
         super().__init__()
         self.api_service = api_service
+        self.keygen_worker = None
         self.init_ui()
     
     def init_ui(self):
@@ -62,12 +89,37 @@ class KeyManagementWidget(QWidget):
         button_layout.addWidget(self.show_private_key_btn)
         layout.addLayout(button_layout)
         
+        # Tạo keys mới
+        keygen_layout = QHBoxLayout()
+        self.key_size_combo = QComboBox()
+        for bits in RSA_KEY_SIZES:
+            self.key_size_combo.addItem(f"RSA-{bits}", bits)
+        self.key_size_combo.setCurrentIndex(RSA_KEY_SIZES.index(RSA_DEFAULT_KEY_BITS))
+        
+        self.generate_keys_btn = QPushButton("Tạo Keys mới")
+        self.generate_keys_btn.setStyleSheet(BUTTON_STYLE)
+        self.generate_keys_btn.clicked.connect(self.generate_new_keys)
+        
+        self.cancel_keygen_btn = QPushButton("Hủy")
+        self.cancel_keygen_btn.setStyleSheet(DANGER_BUTTON_STYLE)
+        self.cancel_keygen_btn.clicked.connect(self.cancel_keygen)
+        self.cancel_keygen_btn.setEnabled(False)
+        
+        keygen_layout.addWidget(self.key_size_combo)
+        keygen_layout.addWidget(self.generate_keys_btn)
+        keygen_layout.addWidget(self.cancel_keygen_btn)
+        layout.addLayout(keygen_layout)
+        
+        self.keygen_status = QLabel("")
+        layout.addWidget(self.keygen_status)
+        
         self.setLayout(layout)
     
     def load_user_keys(self):
         """Tải PUBLIC KEY từ server (không cần password)"""
         try:
-            result, status_code = self.api_service.get_user_keys()
+            # refresh: luôn hỏi lại server (304 nếu key không đổi) thay vì tin cache
+            result, status_code = self.api_service.get_user_keys(refresh=True)
             
             if status_code == 200 and result.get('error') == 0:
                 keys = result.get('data', {})
@@ -83,7 +135,12 @@ class KeyManagementWidget(QWidget):
             show_message(self, "Lỗi", f"Lỗi kết nối: {str(e)}", "error")
     
     def show_private_key(self):
-        """Hiển thị PRIVATE KEY - YÊU CẦU XÁC NHẬN PASSWORD"""
+        """Hiển thị PRIVATE KEY - YÊU CẦU XÁC NHẬN PASSWORD (trừ khi phiên private key đang mở)"""
+        key = self.api_service.key_session.get()
+        if key is not None:
+            self.private_key_text.setText(key.to_decimal())
+            return show_message(self, "Thành công", "Đã hiển thị private key (phiên đang mở khóa)!")
+
         # Yêu cầu nhập password
         password, ok = QInputDialog.getText(
             self, 
@@ -96,11 +153,11 @@ class KeyManagementWidget(QWidget):
             return
         
         try:
-            result, status_code = self.api_service.get_private_key(password)
+            result, status_code = self.api_service.unlock_private_key(password)
+            key = self.api_service.key_session.get()
             
-            if status_code == 200 and result.get('error') == 0:
-                private_key = result.get('data', {}).get('privateKey', '')
-                self.private_key_text.setText(private_key)
+            if status_code == 200 and result.get('error') == 0 and key is not None:
+                self.private_key_text.setText(key.to_decimal())
                 show_message(self, "Thành công", "Đã hiển thị private key!")
             elif status_code == 401:
                 show_message(self, "Lỗi", "Mật khẩu không chính xác!", "error")
@@ -112,13 +169,75 @@ class KeyManagementWidget(QWidget):
             show_message(self, "Lỗi", f"Lỗi kết nối: {str(e)}", "error")
     
     def generate_new_keys(self):
-        """BỎ FUNCTION NÀY - Keys được tạo tự động khi register"""
-        show_message(
-            self, 
-            "Thông báo", 
-            "RSA keys được tạo tự động khi đăng ký.\nKhông cần tạo lại keys thủ công.",
-            "info"
+        """Tạo RSA keypair mới (chạy trên QThread, không block UI) rồi lưu lên server"""
+        if self.keygen_worker is not None:
+            return
+        confirm = show_message(
+            self,
+            "Xác nhận",
+            "Tạo keys mới sẽ thay thế keys hiện tại.\n"
+            "Các file .enc.key cũ (wrap bằng public key cũ) sẽ KHÔNG giải mã được nữa.\n\n"
+            "Tiếp tục?",
+            "question"
         )
+        if confirm != QMessageBox.Yes:
+            return
+        
+        bits = self.key_size_combo.currentData()
+        self.generate_keys_btn.setEnabled(False)
+        self.cancel_keygen_btn.setEnabled(True)
+        self.keygen_status.setText(f"Đang tạo RSA-{bits}...")
+        
+        self.keygen_worker = KeygenWorker(bits)
+        self.keygen_worker.progress.connect(self.on_keygen_progress)
+        self.keygen_worker.key_ready.connect(self.on_key_ready)
+        self.keygen_worker.finished.connect(self.keygen_worker.deleteLater)
+        self.keygen_worker.start()
+    
+    def cancel_keygen(self):
+        if self.keygen_worker is not None:
+            self.keygen_worker.requestInterruption()
+            self.keygen_status.setText("Đang hủy...")
+    
+    def on_keygen_progress(self, primes_found, tested):
+        self.keygen_status.setText(
+            f"Đang tạo keys... đã thử {tested} ứng viên, tìm được {primes_found}/2 số nguyên tố"
+        )
+    
+    def on_key_ready(self, key):
+        # key_ready phát ở cuối run(): chờ thread thoát hẳn rồi mới bỏ tham chiếu
+        # (QThread.finished -> deleteLater dọn đối tượng)
+        worker, self.keygen_worker = self.keygen_worker, None
+        if worker is not None:
+            worker.wait()
+        self.generate_keys_btn.setEnabled(True)
+        self.cancel_keygen_btn.setEnabled(False)
+        
+        if key is None:
+            self.keygen_status.setText("Đã hủy tạo keys")
+            return
+        if isinstance(key, Exception):
+            self.keygen_status.setText("")
+            show_message(self, "Lỗi", f"Không tạo được keys: {key}", "error")
+            return
+        
+        n, e, d, p, q = key
+        public_key = f"{n},{e}"
+        # Private key dạng CRT 'n,d,p,q,dP,dQ,qInv' (backend chỉ đọc 'n,d' ở đầu)
+        private_key = format_private_key(n, d, p, q)
+        try:
+            result, status_code = self.api_service.save_user_keys(public_key, private_key)
+            if status_code == 200 and result.get('error') == 0:
+                self.public_key_text.setText(public_key)
+                self.private_key_text.clear()
+                self.keygen_status.setText(f"Đã tạo và lưu RSA-{n.bit_length()} keys")
+                show_message(self, "Thành công", "Đã tạo và lưu keys mới!")
+            else:
+                self.keygen_status.setText("")
+                show_message(self, "Lỗi", result.get('message', 'Không lưu được keys'), "error")
+        except Exception as e:
+            self.keygen_status.setText("")
+            show_message(self, "Lỗi", f"Lỗi kết nối: {str(e)}", "error")
 
 class FileListWidget(QWidget):
     def __init__(self, api_service):
@@ -155,21 +274,22 @@ class FileListWidget(QWidget):
         self.setLayout(layout)
     
     def refresh_file_list(self):
-        """Làm mới danh sách file"""
+        """Làm mới danh sách file (đồng bộ tăng dần catalog cục bộ rồi hiển thị từ catalog)"""
         try:
-            result, status_code = self.api_service.get_user_files()
+            catalog = self.api_service.file_catalog
+            result, status_code = catalog.sync(self.api_service)
             
             if status_code == 200 and result.get('error') == 0:
-                files = result.get('data', [])
+                files = catalog.list_files(self.api_service.user_id)
+                self.file_list.setUpdatesEnabled(False)
                 self.file_list.clear()
+                self.file_list.addItems([
+                    f"{file_info['filename'] or 'Unknown'} ({file_info['filePath'] or ''})"
+                    for file_info in files
+                ])
+                self.file_list.setUpdatesEnabled(True)
                 
-                for file_info in files:
-                    filename = file_info.get('filename', 'Unknown')
-                    file_path = file_info.get('filePath', '')
-                    item_text = f"{filename} ({file_path})"
-                    self.file_list.addItem(item_text)
-                
-                show_message(self, "Thành công", f"Đã tải {len(files)} file!")
+                show_message(self, "Thành công", f"Đã tải {len(files)} file ({result['synced']} thay đổi)!")
             else:
                 error_msg = result.get('message', 'Không thể tải danh sách file')
                 show_message(self, "Lỗi", error_msg, "error")
@@ -5,20 +5,52 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                              QDialog, QListWidget)
 from PyQt5.QtCore import Qt
 from utils.config import BUTTON_STYLE, DANGER_BUTTON_STYLE
-from utils.helpers import CryptoUtils, show_message, get_file_info, format_file_size
+from utils.helpers import (CryptoUtils, show_message, get_file_info, format_file_size, calculate_enc_fingerprint,
+                           sanitize_filename)
+from services.async_api_service import AsyncAPIService, HAS_AIOHTTP, gather
+from services.async_bridge import AsyncBridge
+from crypto.tracing import span
 import os
+import re
+import functools
 import shutil
-import requests
 import base64
 import tempfile
 import time
 
 
+def log_trace(name):
+    """Đo cả thao tác như một span; khi tracing bật, ghi dòng tóm tắt từng stage vào log"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self):
+            with span(name) as op:
+                result = method(self)
+            summary = op.summary()
+            if summary:
+                self.add_log(f"⏱ {summary}")
+            return result
+        return wrapper
+    return decorator
+
+
+def parse_emails(text):
+    """Danh sách email (cách nhau bởi dấu phẩy, chấm phẩy hoặc khoảng trắng), bỏ trùng"""
+    return list(dict.fromkeys(e for e in re.split(r'[,;\s]+', text) if e))
+
+
+async def _share_all(api, file_id, emails):
+    # Một session aiohttp cho cả lô, đóng khi xong
+    async with api:
+        return await gather([api.share_file(file_id, email) for email in emails])
+
+
 class FileOperationWidget(QWidget):
     def __init__(self, api_service):
         super().__init__()
         self.api_service = api_service
         self.selected_file = None
+        self._async_bridge = None
         self.init_ui()
     
     def init_ui(self):
@@ -136,6 +168,56 @@ class FileOperationWidget(QWidget):
         self.log_text.clear()
         self.add_log("Đã xóa nhật ký")
 
+    def record_uploaded_file(self, uploaded, enc_path):
+        """Ghi file vừa upload vào catalog cục bộ kèm fingerprint file .enc (share tìm theo nội dung)"""
+        if not uploaded or uploaded.get('id') is None:
+            return
+        try:
+            self.api_service.file_catalog.upsert(
+                self.api_service.user_id, [uploaded], content_hash=calculate_enc_fingerprint(enc_path)
+            )
+        except Exception as e:
+            # Catalog chỉ là cache: lỗi không ảnh hưởng thao tác mã hóa
+            self.add_log(f"Không ghi được catalog: {e}")
+
+    def record_local_copy(self, uploaded, local_path):
+        """Ghi nhớ file .enc đã lưu ở local_path (share tìm theo đường dẫn, không cần hash)"""
+        if not uploaded or uploaded.get('id') is None:
+            return
+        try:
+            self.api_service.file_catalog.set_local_path(self.api_service.user_id, uploaded['id'], local_path)
+        except Exception as e:
+            self.add_log(f"Không ghi được catalog: {e}")
+
+    def get_session_private_key(self):
+        """
+        Private key từ phiên đã mở khóa (api_service.key_session); phiên đã khóa thì
+        hỏi password và mở lại. Trả về None nếu hủy hoặc mở khóa thất bại (đã báo lỗi).
+        """
+        key = self.api_service.key_session.get()
+        if key is not None:
+            return key
+        password, ok = QInputDialog.getText(
+            self,
+            "Xác nhận mật khẩu",
+            "Nhập mật khẩu để mở khóa Private Key (dùng lại cho các lần giải mã sau):",
+            QLineEdit.Password
+        )
+        if not ok or not password:
+            self.add_log("Đã hủy nhập password")
+            return None
+        result, status = self.api_service.unlock_private_key(password)
+        if status != 200 or result.get('error') != 0:
+            if status == 401:
+                msg = "❌ Mật khẩu không chính xác!"
+            else:
+                msg = result.get('message', "❌ Không lấy được private key")
+            self.add_log(f"Lỗi: {msg}")
+            show_message(self, "Lỗi", msg, "error")
+            return None
+        self.add_log("🔓 Đã mở khóa private key")
+        return self.api_service.key_session.get()
+
     def start_operation(self, status_text="Đang xử lý..."):
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)  # Vô hạn
@@ -182,6 +264,7 @@ class FileOperationWidget(QWidget):
         self.share_btn.setEnabled(False)
         self.add_log("Đã xóa file đã chọn")
 
+    @log_trace("ui.encrypt_file")
     def encrypt_file(self):
         if not self.selected_file:
             return show_message(self, "Lỗi", "Chọn file trước", "error")
@@ -215,19 +298,16 @@ class FileOperationWidget(QWidget):
 
             # 4. Gửi metadata lên /file/upload
             filename = os.path.basename(self.selected_file)
-            payload = {
-                'filename': filename,
-                'filePath': enc_path,  # include encrypted file path so backend can record it
-                'aesKey': encrypted_aes_key_b64  # ✅ GỬI WRAPPED KEY (đã mã hóa bằng RSA)
-            }
-            response = requests.post(
-                f'{self.api_service.base_url}/file/upload',
-                json=payload,
-                headers=self.api_service.get_headers()
-            )
-            result, status_code = response.json(), response.status_code
+            with span("http.file_upload"):
+                # enc_path: backend ghi lại đường dẫn file mã hóa
+                # ✅ GỬI WRAPPED KEY (đã mã hóa bằng RSA)
+                result, status_code = self.api_service.upload_file_metadata(
+                    filename, enc_path, encrypted_aes_key_b64
+                )
             if status_code not in (200, 201):
                 raise ValueError(result.get('message', 'Upload metadata thất bại'))
+            uploaded = result.get('file')
+            self.record_uploaded_file(uploaded, enc_path)
 
             # 5. Lưu file + key local
             save_dir = QFileDialog.getExistingDirectory(self, "Chọn thư mục lưu")
@@ -241,18 +321,20 @@ class FileOperationWidget(QWidget):
             # transient Windows file locks (WinError 32). If copying fails permanently,
             # raise and cleanup temp file.
             copy_attempts = 5
-            for attempt in range(1, copy_attempts + 1):
-                try:
-                    shutil.copy2(enc_path, final_enc)
-                    break
-                except PermissionError as e:
-                    # WinError 32 -> file locked, wait and retry
-                    if attempt == copy_attempts:
-                        raise
-                    time.sleep(0.2 * attempt)
-
-            with open(final_key, 'w', encoding='utf-8') as f:
+            with span("copy_encrypted_file", os.path.getsize(enc_path)):
+                for attempt in range(1, copy_attempts + 1):
+                    try:
+                        shutil.copy2(enc_path, final_enc)
+                        break
+                    except PermissionError as e:
+                        # WinError 32 -> file locked, wait and retry
+                        if attempt == copy_attempts:
+                            raise
+                        time.sleep(0.2 * attempt)
+
+            with span("write_key_file"), open(final_key, 'w', encoding='utf-8') as f:
                 f.write(encrypted_aes_key_b64)
+            self.record_local_copy(uploaded, final_enc)
 
             try:
                 os.remove(enc_path)
@@ -276,6 +358,7 @@ class FileOperationWidget(QWidget):
         finally:
             self.finish_operation()
 
+    @log_trace("ui.decrypt_file")
     def decrypt_file(self):
         if not self.selected_file or not self.selected_file.endswith('.enc'):
             return show_message(self, "Lỗi", "Chọn file .enc", "error")
@@ -284,35 +367,21 @@ class FileOperationWidget(QWidget):
         if not key_path:
             return
 
-        # YÊU CẦU PASSWORD để lấy private key
-        password, ok = QInputDialog.getText(
-            self, 
-            "Xác nhận mật khẩu", 
-            "Nhập mật khẩu để lấy Private Key cho giải mã:",
-            QLineEdit.Password
-        )
-        
-        if not ok or not password:
+        # Private key của phiên (chỉ hỏi password nếu phiên đã khóa/hết hạn)
+        private_key = self.get_session_private_key()
+        if private_key is None:
             return
 
         self.start_operation("Đang giải mã...")
 
         try:
-            # 1. Lấy private key với password verification
-            keys, status = self.api_service.get_private_key(password)
-            if status != 200 or keys.get('error') != 0:
-                if status == 401:
-                    raise ValueError("Mật khẩu không chính xác!")
-                raise ValueError("Không lấy được private key")
-            private_key = keys['data']['privateKey']
-
-            # 2. Đọc encrypted key từ file .key
+            # 1. Đọc encrypted key từ file .key
             encrypted_aes_key_b64 = open(key_path, 'r', encoding='utf-8').read().strip()
 
-            # 3. Giải mã AES key bằng RSA
+            # 2. Giải mã AES key bằng RSA
             aes_key_b64 = CryptoUtils.unwrap_aes_key_with_rsa(encrypted_aes_key_b64, private_key)
 
-            # 4. Giải mã file
+            # 3. Giải mã file
             save_path, _ = QFileDialog.getSaveFileName(
                 self, "Lưu file gốc", os.path.basename(self.selected_file).replace('.enc', ''), "All Files (*)"
             )
@@ -358,23 +427,32 @@ class FileOperationWidget(QWidget):
             selected_filename = os.path.basename(self.selected_file).replace('.enc', '')
             self.add_log(f"Chuẩn bị share file: {selected_filename}")
             
-            # 4. Lấy danh sách file từ server để tìm file ID
-            response, status = self.api_service.get_user_files()
+            # 4. Đồng bộ catalog cục bộ (chỉ tải các file thay đổi từ lần trước)
+            catalog = self.api_service.file_catalog
+            user_id = self.api_service.user_id
+            response, status = catalog.sync(self.api_service)
             if status != 200 or response.get('error') != 0:
-                show_message(self, "Lỗi", "Không thể lấy danh sách file từ server", "error")
-                return
+                if catalog.count(user_id) == 0:
+                    show_message(self, "Lỗi", "Không thể lấy danh sách file từ server", "error")
+                    return
+                self.add_log("Không đồng bộ được danh sách file, dùng catalog cục bộ")
             
-            files = response.get('data', [])
-            if not files:
+            if catalog.count(user_id) == 0:
                 show_message(self, "Lỗi", "Bạn chưa có file nào trên server.\nHãy mã hóa và upload file trước!", "warning")
                 return
             
-            # 5. Tìm file tương ứng trong database
-            matched_file = None
-            for file in files:
-                if file['filename'] == selected_filename:
-                    matched_file = file
-                    break
+            # 5. Tìm file tương ứng trong catalog: theo đường dẫn file .enc đã lưu trên
+            # máy này, rồi theo tên file; chỉ hash nội dung khi không có hoặc trùng tên
+            matched_file = catalog.find_by_local_path(user_id, self.selected_file)
+            if matched_file is None:
+                matches = catalog.find_by_filename(user_id, selected_filename)
+                if len(matches) != 1:
+                    by_hash = catalog.find_by_hash(user_id, calculate_enc_fingerprint(self.selected_file))
+                    if by_hash:
+                        matches = by_hash
+                        # Lần share sau tìm được ngay theo đường dẫn
+                        self.record_local_copy(by_hash[0], self.selected_file)
+                matched_file = matches[0] if matches else None
             
             if not matched_file:
                 show_message(
@@ -406,7 +484,7 @@ class FileOperationWidget(QWidget):
             layout.addWidget(info_label)
             
             # Input email
-            email_label = QLabel("Email người nhận:")
+            email_label = QLabel("Email người nhận (nhiều người: cách nhau bởi dấu phẩy):")
             layout.addWidget(email_label)
             
             email_input = QLineEdit()
@@ -425,10 +503,15 @@ class FileOperationWidget(QWidget):
             
             # 7. Xử lý khi click share
             def on_share():
-                recipient_email = email_input.text().strip()
-                if not recipient_email:
+                emails = parse_emails(email_input.text())
+                if not emails:
                     show_message(self, "Lỗi", "Vui lòng nhập email người nhận", "warning")
                     return
+                if len(emails) > 1:
+                    dialog.accept()
+                    self.share_file_batch(file_id, emails)
+                    return
+                recipient_email = emails[0]
                 
                 # Gọi API share
                 self.add_log(f"Đang share file ID {file_id} cho {recipient_email}...")
@@ -493,6 +576,72 @@ class FileOperationWidget(QWidget):
             self.add_log(f"Lỗi share file: {e}")
             show_message(self, "Lỗi", str(e), "error")
 
+    @property
+    def async_bridge(self):
+        """AsyncBridge dùng chung cho các thao tác hàng loạt (tạo khi cần)"""
+        if self._async_bridge is None:
+            self._async_bridge = AsyncBridge(self)
+        return self._async_bridge
+
+    def close_async_bridge(self):
+        if self._async_bridge is not None:
+            self._async_bridge.close()
+            self._async_bridge = None
+
+    def share_file_batch(self, file_id, emails):
+        """
+        Share file cho nhiều người nhận: các request chạy đồng thời trên AsyncBridge
+        (không chặn GUI, không mỗi request một QThread). Không có aiohttp thì share lần lượt.
+        Mỗi người nhận một file key: <file>.enc.<email>.key
+        """
+        enc_path = self.selected_file
+        self.add_log(f"Đang share file ID {file_id} cho {len(emails)} người nhận...")
+        self.start_operation(f"Đang chia sẻ cho {len(emails)} người nhận...")
+        if not HAS_AIOHTTP:
+            results = [self.api_service.share_file(file_id, email) for email in emails]
+            return self.on_batch_shared(enc_path, emails, results)
+        api = AsyncAPIService.from_service(self.api_service)
+        self.async_bridge.submit(
+            _share_all(api, file_id, emails),
+            lambda results: self.on_batch_shared(enc_path, emails, results),
+            self.on_batch_share_error
+        )
+
+    def on_batch_shared(self, enc_path, emails, results):
+        self.finish_operation()
+        key_files, failed = [], []
+        for email, (result, status) in zip(emails, results):
+            result = result if isinstance(result, dict) else {}
+            # Backend đã re-wrap AES key bằng public key của từng người nhận
+            wrapped_key_b64 = (result.get('sharedFile') or {}).get('aesKey')
+            if status != 200 or result.get('error') != 0 or not wrapped_key_b64:
+                failed.append(f"{email}: {result.get('message') or result.get('error') or 'Không có wrapped key'}")
+                continue
+            key_file_path = f"{enc_path}.{sanitize_filename(email)}.key"
+            try:
+                with open(key_file_path, 'wb') as f:
+                    f.write(base64.b64decode(wrapped_key_b64))
+            except Exception as e:
+                failed.append(f"{email}: Không thể tạo file key ({e})")
+                continue
+            key_files.append(key_file_path)
+            self.add_log(f"✅ {email}: {os.path.basename(key_file_path)}")
+        for line in failed:
+            self.add_log(f"Share thất bại - {line}")
+        message = f"Đã chia sẻ cho {len(key_files)}/{len(emails)} người nhận."
+        if key_files:
+            message += "\n\nGửi file .enc kèm file key tương ứng cho từng người:\n" + \
+                "\n".join(os.path.basename(p) for p in key_files)
+        if failed:
+            message += "\n\nThất bại:\n" + "\n".join(failed)
+        show_message(self, "Kết quả chia sẻ", message, "warning" if failed else "info")
+
+    def on_batch_share_error(self, error):
+        self.finish_operation()
+        self.add_log(f"Lỗi share file: {error}")
+        show_message(self, "Lỗi", str(error), "error")
+
+    @log_trace("ui.decrypt_shared_file")
     def decrypt_shared_file(self):
         """
         Giải mã file được chia sẻ từ bạn bè (LUỒNG MỚI - Đơn giản hơn)
@@ -538,33 +687,13 @@ class FileOperationWidget(QWidget):
             
             self.add_log(f"🔑 Đã chọn file key: {key_file}")
             
-            # 3. Yêu cầu password để lấy private key
-            password, ok = QInputDialog.getText(
-                self, 
-                "Xác nhận", 
-                "Nhập mật khẩu để giải mã:", 
-                QLineEdit.Password
-            )
-            if not ok or not password:
-                self.add_log("Đã hủy nhập password")
-                self.finish_operation()
-                return
-            
-            # 4. Lấy private key từ server
-            self.add_log("Đang lấy private key...")
-            keys, status = self.api_service.get_private_key(password)
-            if status != 200 or keys.get('error') != 0:
-                if status == 401:
-                    show_message(self, "Lỗi", "❌ Mật khẩu không chính xác!", "error")
-                else:
-                    show_message(self, "Lỗi", "❌ Không lấy được private key", "error")
+            # 3. Private key của phiên (chỉ hỏi password nếu phiên đã khóa/hết hạn)
+            private_key = self.get_session_private_key()
+            if private_key is None:
                 self.finish_operation()
                 return
             
-            private_key = keys['data']['privateKey']
-            self.add_log("✅ Đã lấy private key thành công")
-            
-            # 5. Đọc wrapped key từ file .enc.key
+            # 4. Đọc wrapped key từ file .enc.key
             self.add_log("Đang đọc file .enc.key...")
             with open(key_file, 'rb') as f:
                 wrapped_key_bytes = f.read()
@@ -574,12 +703,12 @@ class FileOperationWidget(QWidget):
             wrapped_key_b64 = base64.b64encode(wrapped_key_bytes).decode()
             self.add_log(f"Đã đọc {len(wrapped_key_bytes)} bytes từ file .enc.key")
             
-            # 6. Unwrap AES key bằng RSA private key
+            # 5. Unwrap AES key bằng RSA private key
             self.add_log("Đang unwrap AES key...")
             aes_key_b64 = CryptoUtils.unwrap_aes_key_with_rsa(wrapped_key_b64, private_key)
             self.add_log("✅ Unwrap AES key thành công")
             
-            # 7. Kiểm tra độ dài AES key
+            # 6. Kiểm tra độ dài AES key
             aes_key_bytes = base64.b64decode(aes_key_b64)
             self.add_log(f"DEBUG: AES key length = {len(aes_key_bytes)} bytes")
             self.add_log(f"DEBUG: AES key (hex) = {aes_key_bytes.hex()}")
@@ -597,7 +726,7 @@ class FileOperationWidget(QWidget):
                 self.finish_operation()
                 return
             
-            # 8. Chọn nơi lưu file đã giải mã
+            # 7. Chọn nơi lưu file đã giải mã
             original_name = os.path.basename(enc_file).replace('.enc', '')
             save_path, _ = QFileDialog.getSaveFileName(
                 self, 
@@ -610,7 +739,7 @@ class FileOperationWidget(QWidget):
                 self.finish_operation()
                 return
             
-            # 9. Giải mã file
+            # 8. Giải mã file
             self.add_log(f"Đang giải mã file...")
             CryptoUtils.decrypt_file(enc_file, save_path, aes_key_b64)
             
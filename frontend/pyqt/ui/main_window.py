@@ -1,7 +1,7 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                              QStackedWidget, QMenuBar, QStatusBar, QAction,
                              QTabWidget, QMessageBox)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QIcon
 from services.api_service import APIService
 from ui.login_widget import LoginWidget
@@ -11,6 +11,9 @@ from utils.config import WINDOW_TITLE, WINDOW_WIDTH, WINDOW_HEIGHT
 from utils.helpers import show_message
 
 class MainWindow(QMainWindow):
+    # Phiên private key hết thời gian chờ (phát từ thread timer của PrivateKeySession)
+    key_session_timeout = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.api_service = APIService()
@@ -18,6 +21,9 @@ class MainWindow(QMainWindow):
         self.init_ui()
         self.setup_menu()
         self.setup_status_bar()
+        # Signal queued: xử lý trên thread GUI
+        self.key_session_timeout.connect(self.on_key_session_timeout)
+        self.api_service.key_session.on_timeout = self.key_session_timeout.emit
     
     def init_ui(self):
         """Khởi tạo giao diện chính"""
@@ -70,6 +76,12 @@ class MainWindow(QMainWindow):
         self.logout_action.triggered.connect(self.logout)
         self.logout_action.setEnabled(False)
         file_menu.addAction(self.logout_action)
+
+        # Khóa phiên private key (lần giải mã sau phải nhập lại password)
+        self.lock_key_action = QAction('Khóa Private Key', self)
+        self.lock_key_action.triggered.connect(self.lock_private_key)
+        self.lock_key_action.setEnabled(False)
+        file_menu.addAction(self.lock_key_action)
         
         file_menu.addSeparator()
         
@@ -100,11 +112,23 @@ class MainWindow(QMainWindow):
         
         # Cập nhật UI
         self.logout_action.setEnabled(True)
+        self.lock_key_action.setEnabled(True)
         self.status_bar.showMessage("Đã đăng nhập - Sẵn sàng sử dụng")
         
         # Thêm log
         self.file_operation_widget.add_log("Đăng nhập thành công!")
     
+    def lock_private_key(self):
+        """Khóa phiên private key"""
+        self.api_service.lock_private_key()
+        self.file_operation_widget.add_log("🔒 Đã khóa private key")
+        self.status_bar.showMessage("Đã khóa private key", 3000)
+
+    def on_key_session_timeout(self):
+        """Phiên private key tự khóa do không dùng quá PRIVATE_KEY_IDLE_TIMEOUT"""
+        self.file_operation_widget.add_log("🔒 Private key đã tự khóa (hết thời gian chờ)")
+        self.status_bar.showMessage("Private key đã tự khóa do không sử dụng", 5000)
+
     def logout(self):
         """Đăng xuất"""
         reply = show_message(
@@ -122,9 +146,10 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
 
-            # Reset token
+            # Reset token, xóa private key khỏi bộ nhớ (kể cả khi gọi backend lỗi)
             self.current_user_token = None
             self.api_service.set_token(None)
+            self.api_service.lock_private_key()
             
             # Quay về màn hình login
             self.stacked_widget.setCurrentWidget(self.login_widget)
@@ -145,6 +170,7 @@ class MainWindow(QMainWindow):
             
             # Cập nhật UI
             self.logout_action.setEnabled(False)
+            self.lock_key_action.setEnabled(False)
             self.status_bar.showMessage("Chưa đăng nhập")
     
     def show_about(self):
@@ -174,6 +200,7 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
+            self.file_operation_widget.close_async_bridge()
             event.accept()
         else:
             event.ignore()
\ No newline at end of file
@@ -1,5 +1,20 @@
+import os
+
 # Cấu hình API
 API_BASE_URL = "http://localhost:5000/api"
+# HTTP transport (services/transport.py)
+HTTP_POOL_SIZE = 10                  # Số kết nối keep-alive tối đa tới backend
+HTTP_CONNECT_TIMEOUT = 5             # giây
+HTTP_READ_TIMEOUT = 60               # giây
+HTTP_RETRIES = 3                     # Chỉ request idempotent (GET...) và lỗi kết nối
+HTTP_BACKOFF = 0.5                   # Chờ 0.5s, 1s, 2s... giữa các lần retry
+HTTP_GZIP_MIN_SIZE = 16 * 1024       # Body JSON lớn hơn được nén gzip
+ASYNC_MAX_CONCURRENCY = 32           # Số request đồng thời tối đa của AsyncAPIService
+PUBLIC_KEY_CACHE_TTL = 300           # giây; public key của user được cache (APIService.get_user_keys)
+PRIVATE_KEY_IDLE_TIMEOUT = 10 * 60   # giây; private key đã mở khóa bị xóa nếu không dùng
+# Catalog file cục bộ (services/file_catalog.py)
+FILE_CATALOG_PATH = os.path.join(os.path.expanduser("~"), ".securefile", "file_catalog.sqlite3")
+FILE_SYNC_PAGE_SIZE = 1000           # Số file mỗi trang khi đồng bộ tăng dần
 
 # Demo Mode - Bật để test UI mà không cần backend
 # Set to False to use the real backend
@@ -12,6 +27,16 @@ WINDOW_HEIGHT = 600
 
 # Cấu hình file
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+# Số process dùng để mã hóa/giải mã file lớn (1 = chỉ dùng 1 core)
+CRYPTO_WORKERS = os.cpu_count() or 1
+# File lớn hơn ngưỡng này được mã hóa/giải mã qua mmap thay vì stream
+MMAP_THRESHOLD = 256 * 1024 * 1024  # 256MB
+# Ghim AES engine: "cryptography", "numpy", "bitslice", "ttable", "reference"
+# None = tự chọn engine nhanh nhất (hoặc theo biến môi trường CRYPTO_AES_BACKEND)
+AES_BACKEND = None
+# Kích thước RSA key khi tạo keys mới (tab Quản lý Keys)
+RSA_KEY_SIZES = [2048, 3072, 4096]
+RSA_DEFAULT_KEY_BITS = 3072
 SUPPORTED_FILE_TYPES = ["txt", "pdf", "doc", "docx", "jpg", "png", "mp4", "zip"]
 
 # Styling
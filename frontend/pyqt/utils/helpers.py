@@ -5,12 +5,19 @@ import base64
 import secrets
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import QFileInfo
+from utils.config import CRYPTO_WORKERS, MMAP_THRESHOLD, AES_BACKEND
 
 # Import trực tiếp từ crypto/ (không dùng subprocess)
-from crypto.aes_encrypt import encrypt_file_data
-from crypto.aes_decrypt import decrypt_file_data
+from crypto.aes_stream import decrypt_stream
+from crypto.aes_mmap import decrypt_file_mmap
+from crypto.container import write_container, read_container, is_container, fingerprint
+from crypto.tracing import span, traced
+from crypto.backends import set_default_backend
 from crypto.cryptoRSA_test.rsa_wrap_key import seal_aes_key, open_aes_key
 
+if AES_BACKEND:
+    set_default_backend(AES_BACKEND)
+
 
 def show_message(parent, title, message, msg_type="info"):
     """Hiển thị message box"""
@@ -73,6 +80,19 @@ def calculate_file_hash(file_path, algorithm='sha256'):
         return None
 
 
+def calculate_enc_fingerprint(file_path):
+    """
+    Định danh file .enc cho catalog: container v2 dùng fingerprint (header + nonce/tag
+    từng chunk, không đọc hết file), file cũ thì SHA-256 cả file
+    """
+    if is_container(file_path):
+        try:
+            return fingerprint(file_path)
+        except (OSError, ValueError):
+            return None
+    return calculate_file_hash(file_path)
+
+
 def format_file_size(size_bytes):
     """Format kích thước file"""
     if size_bytes == 0:
@@ -102,24 +122,32 @@ class CryptoUtils:
         return base64.b64encode(secrets.token_bytes(16)).decode()
 
     @staticmethod
-    def encrypt_file(input_file: str, output_file: str, aes_key_b64: str):
-        """Mã hóa file bằng AES (gọi trực tiếp hàm từ aes_encrypt.py)"""
-        with open(input_file, 'rb') as f:
-            data = f.read()
-        encrypted_data = encrypt_file_data(data, aes_key_b64)
-        with open(output_file, 'wb') as f:
-            f.write(encrypted_data)
+    def encrypt_file(input_file: str, output_file: str, aes_key_b64: str, workers: int = CRYPTO_WORKERS):
+        """Mã hóa file thành container v2 (AES-GCM theo chunk, xem crypto/container.py)"""
+        with span("CryptoUtils.encrypt_file", os.path.getsize(input_file)):
+            write_container(input_file, output_file, base64.b64decode(aes_key_b64), workers=workers)
 
     @staticmethod
-    def decrypt_file(input_file: str, output_file: str, aes_key_b64: str):
-        """Giải mã file bằng AES (gọi trực tiếp hàm từ aes_decrypt.py)"""
-        with open(input_file, 'rb') as f:
-            data = f.read()
-        decrypted_data = decrypt_file_data(data, aes_key_b64)
-        with open(output_file, 'wb') as f:
-            f.write(decrypted_data)
+    def decrypt_file(input_file: str, output_file: str, aes_key_b64: str, workers: int = CRYPTO_WORKERS):
+        """Giải mã file .enc: tự nhận container v2, file cũ (ECB không header) vẫn giải mã được"""
+        key = base64.b64decode(aes_key_b64)
+        size = os.path.getsize(input_file)
+        with span("CryptoUtils.decrypt_file", size):
+            if is_container(input_file):
+                return read_container(input_file, output_file, key, workers=workers)
+            if size >= MMAP_THRESHOLD:
+                return decrypt_file_mmap(input_file, output_file, key, workers)
+            # Padding chỉ kiểm tra được ở block cuối: lỗi thì xóa plaintext đã ghi
+            try:
+                with open(input_file, 'rb') as src, open(output_file, 'wb') as dst:
+                    decrypt_stream(src, dst, key, workers=workers)
+            except Exception:
+                if os.path.exists(output_file):
+                    os.remove(output_file)
+                raise
 
     @staticmethod
+    @traced("CryptoUtils.wrap_aes_key_with_rsa")
     def wrap_aes_key_with_rsa(aes_key_b64: str, public_key_str: str) -> str:
         """
         Mã hóa AES key bằng RSA public key (string 'n,e')
@@ -130,9 +158,12 @@ class CryptoUtils:
         return base64.b64encode(encrypted_bytes).decode()
 
     @staticmethod
+    @traced("CryptoUtils.unwrap_aes_key_with_rsa")
     def unwrap_aes_key_with_rsa(encrypted_key_b64: str, private_key_str: str) -> str:
         """
-        Giải mã encrypted AES key bằng RSA private key (string 'n,d')
+        Giải mã encrypted AES key bằng RSA private key (string 'n,d'
+        hoặc 'n,d,p,q,dP,dQ,qInv' -> dùng CRT, nhanh hơn ~3 lần), hoặc
+        RSAPrivateKey đã parse (APIService.key_session.get())
         Trả về AES key (base64)
         """
         enc_bytes = base64.b64decode(encrypted_key_b64)